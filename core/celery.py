@@ -20,5 +20,21 @@ app.conf.beat_schedule = {
         'task': 'stories.tasks.reindex_all_stories',
         'schedule': crontab(hour=0, minute=0),  # Runs every midnight
     },
+    'refresh-trending-stories': {
+        'task': 'stories.tasks.refresh_trending_stories',
+        'schedule': crontab(minute='*/10'),  # Runs every 10 minutes
+    },
+    'refresh-trending-hashtags': {
+        'task': 'stories.tasks.refresh_trending_hashtags',
+        'schedule': crontab(minute='*'),  # Runs every minute
+    },
+    'flush-search-index': {
+        'task': 'stories.tasks.flush_search_index',
+        'schedule': settings.ES_INDEX_FLUSH_INTERVAL_MS / 1000,
+    },
+    'sync-story-graph': {
+        'task': 'stories.tasks.sync_story_graph',
+        'schedule': 10.0,  # Picks up records whose trigger was lost
+    },
 }
 # core/celery.py
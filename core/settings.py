@@ -225,12 +225,53 @@ NEO4J_HOST = config(
     "NEO4J_HOST", default="db-neo4j"
 )  # default could also be 'localhost'
 NEO4J_PORT = config("NEO4J_PORT", default="7687")
+# Use "neo4j" against a cluster so READ sessions are routed to followers
+NEO4J_SCHEME = config("NEO4J_SCHEME", default="bolt")
 
 NEOMODEL_NEO4J_BOLT_URL = (
-    f"bolt://{NEO4J_USERNAME}:{NEO4J_PASSWORD}@{NEO4J_HOST}:{NEO4J_PORT}"
+    f"{NEO4J_SCHEME}://{NEO4J_USERNAME}:{NEO4J_PASSWORD}@{NEO4J_HOST}:{NEO4J_PORT}"
 )
 
 
+# Elasticsearch bulk indexing
+ES_BULK_CHUNK_SIZE = config("ES_BULK_CHUNK_SIZE", default=500, cast=int)
+ES_BULK_THREAD_COUNT = config("ES_BULK_THREAD_COUNT", default=4, cast=int)
+# Elasticsearch refresh policy for story writes: "immediate" refreshes after
+# every write, "wait_for" blocks writes until the next refresh, "interval"
+# leaves visibility to the index's refresh_interval
+ES_REFRESH_POLICY = config("ES_REFRESH_POLICY", default="interval")
+ES_REFRESH_INTERVAL = config("ES_REFRESH_INTERVAL", default="1s")
+
+# Batched search index updates from story writes
+ES_INDEX_FLUSH_INTERVAL_MS = config(
+    "ES_INDEX_FLUSH_INTERVAL_MS", default=1000, cast=int)
+ES_INDEX_FLUSH_BATCH_SIZE = config(
+    "ES_INDEX_FLUSH_BATCH_SIZE", default=1000, cast=int)
+# How long one flush run keeps sending batches while updates are pending
+ES_INDEX_FLUSH_TIME_BUDGET = config(
+    "ES_INDEX_FLUSH_TIME_BUDGET", default=30.0, cast=float)
+# Times a story whose document update failed is queued again before it is
+# dropped
+ES_INDEX_FLUSH_MAX_RETRIES = config(
+    "ES_INDEX_FLUSH_MAX_RETRIES", default=3, cast=int)
+# Previous index generations kept after an alias swap, for rollback
+ES_INDEX_GENERATIONS_KEPT = config(
+    "ES_INDEX_GENERATIONS_KEPT", default=1, cast=int)
+
+# Longest FOLLOWS path walked by the story timeline endpoint
+STORYLINE_TIMELINE_MAX_DEPTH = config(
+    "STORYLINE_TIMELINE_MAX_DEPTH", default=500, cast=int)
+
+# Neo4j driver connection pool
+NEO4J_MAX_CONNECTION_POOL_SIZE = config(
+    "NEO4J_MAX_CONNECTION_POOL_SIZE", default=50, cast=int)
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = config(
+    "NEO4J_CONNECTION_ACQUISITION_TIMEOUT", default=60.0, cast=float)
+NEO4J_MAX_CONNECTION_LIFETIME = config(
+    "NEO4J_MAX_CONNECTION_LIFETIME", default=3600, cast=int)
+NEO4J_POOL_METRICS_INTERVAL = config(
+    "NEO4J_POOL_METRICS_INTERVAL", default=10, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -368,6 +409,23 @@ POSTS_PER_PAGE = config("POSTS_PER_PAGE", default=10, cast=int)
 ANCESTORS_PER_PAGE = config("ANCESTORS_PER_PAGE", default=4, cast=int)
 DESCENDANTS_PER_PAGE = config("DESCENDANTS_PER_PAGE", default=5, cast=int)
 
+# Trending stories: exponential half-life decay over a bounded event window
+TRENDING_HALF_LIFE_HOURS = config(
+    "TRENDING_HALF_LIFE_HOURS", default=12, cast=float)
+TRENDING_WINDOW_DAYS = config("TRENDING_WINDOW_DAYS", default=7, cast=int)
+TRENDING_TOP_N = config("TRENDING_TOP_N", default=500, cast=int)
+
+# Materialized user feeds (per-user capped Redis lists)
+FEED_MAX_LENGTH = config("FEED_MAX_LENGTH", default=1000, cast=int)
+FEED_TTL_SECONDS = config("FEED_TTL_SECONDS", default=7 * 24 * 3600, cast=int)
+
+# Postgres to Neo4j sync worker
+NEO_SYNC_BATCH_SIZE = config("NEO_SYNC_BATCH_SIZE", default=500, cast=int)
+
+# Versioned response cache for anonymous reads
+RESPONSE_CACHE_TIMEOUT = config(
+    "RESPONSE_CACHE_TIMEOUT", default=300, cast=int)
+
 GS_BUCKET_NAME = config("GS_BUCKET_NAME")
 GS_CREDENTIALS = config("GS_CREDENTIALS")
 GS_PROJECT_ID = config("GS_PROJECT_ID")
@@ -5,6 +5,9 @@ class StoriesConfig(AppConfig):
     name = 'stories'
 
     def ready(self):
+        from stories.neo_db import configure_driver
+        configure_driver()
+
         import stories.neo_signals
         import stories.signals
 
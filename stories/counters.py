@@ -0,0 +1,57 @@
+import logging
+from django.apps import apps
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from .models import Story, Like, Dislike
+
+# Set up the logger for this module
+logger = logging.getLogger('app_logger')
+
+
+def adjust_counter(story_id, field, delta):
+    """
+    Atomically add `delta` to one of the denormalized engagement counters.
+
+    The update is a single `UPDATE ... SET field = field + delta` so concurrent
+    writers never lose increments, and it never drops below zero. Cached
+    responses embedding the counter are invalidated by the caller.
+    """
+    if field not in Story.COUNTER_FIELDS:
+        raise ValueError(f'Unknown story counter: {field}')
+    logger.debug(f'Adjusting {field} by {delta} for story {story_id}')
+    Story.objects.filter(pk=story_id).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+def _count_subquery(queryset):
+    counts = (
+        queryset.filter(story=OuterRef("pk"))
+        .order_by()
+        .values("story")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def recompute_counters(queryset=None):
+    """
+    Recompute the engagement counters from the source rows.
+
+    Runs one UPDATE with correlated subqueries over `queryset` (all stories by
+    default) and returns the number of stories updated.
+    """
+    StoryInteraction = apps.get_model('analytics', 'StoryInteraction')
+    if queryset is None:
+        queryset = Story.objects.all()
+
+    logger.info('Recomputing story engagement counters from source rows')
+    return queryset.update(
+        like_count=_count_subquery(Like.objects.all()),
+        dislike_count=_count_subquery(Dislike.objects.all()),
+        view_count=_count_subquery(
+            StoryInteraction.objects.filter(interaction_type="view")),
+    )
+
+
+# stories/counters.py
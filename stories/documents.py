@@ -1,4 +1,5 @@
 import logging
+from django.conf import settings as django_settings
 from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 from .models import Story
@@ -44,6 +45,9 @@ class StoryDocument(Document):
         }
     )
 
+    # Normalized hashtags, for exact-match filters
+    hashtags = fields.KeywordField(multi=True)
+
     # body = fields.TextField(analyzer='custom_text_analyzer')
 
     body = fields.TextField(
@@ -61,6 +65,7 @@ class StoryDocument(Document):
         settings = {
             'number_of_shards': 1,
             'number_of_replicas': 0,
+            'refresh_interval': django_settings.ES_REFRESH_INTERVAL,
             'index.max_ngram_diff': 7,  # Allow difference of 7 (10 - 3)
             'analysis': {
                 'analyzer': {
@@ -105,8 +110,11 @@ class StoryDocument(Document):
             'event_reported_at',
         ]
         # Additional fields that may require custom mapping
-        ignore_signals = False
-        auto_refresh = True
+        # Writes go through the batched flusher in stories.indexing
+        ignore_signals = True
+        # True, "wait_for" or False, per ES_REFRESH_POLICY
+        auto_refresh = {"immediate": True, "wait_for": "wait_for"}.get(
+            django_settings.ES_REFRESH_POLICY, False)
         queryset_pagination = 5000
 
     def save(self, **kwargs):
@@ -0,0 +1,196 @@
+import logging
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Q
+from django_redis import get_redis_connection
+from utils.pagination import LazySequence
+from .models import Story
+from .utils import hydrate_stories
+
+# Set up the logger for this module
+logger = logging.getLogger('app_logger')
+
+FEED_KEY = "feed:user:{user_id}"
+ALL_CATEGORIES = "__all__"
+
+
+def _feed_key(user_id):
+    return FEED_KEY.format(user_id=user_id)
+
+
+def _favorite_categories(user_id):
+    """
+    Return the user's favorite categories, or None without user settings.
+    """
+    UserSetting = apps.get_model('users', 'UserSetting')
+    personal_settings = (
+        UserSetting.objects.filter(user_id=user_id)
+        .values_list("personal_settings", flat=True)
+        .first()
+    )
+    if personal_settings is None:
+        return None
+    return personal_settings.get("favorite_categories", [])
+
+
+def feed_queryset(user_id, favorite_categories=None):
+    """
+    Source query of a user's feed: favorite categories plus followed authors,
+    active and unflagged.
+
+    Shared by the materialized feed and the feed view's database paths, so
+    every path returns the same stories. Subscribers of all categories get
+    every active story. Favorite categories are read from the user's
+    settings unless given.
+    """
+    if favorite_categories is None:
+        favorite_categories = _favorite_categories(user_id) or []
+    stories = Story.active_unflagged_objects.active_and_unflagged()
+    if ALL_CATEGORIES in favorite_categories:
+        return stories
+    Follow = apps.get_model('users', 'Follow')
+    followed_ids = Follow.objects.filter(
+        follower_id=user_id, deleted_at__isnull=True).values("followed_id")
+    return stories.filter(
+        Q(category__id__in=favorite_categories) | Q(user_id__in=followed_ids)
+    )
+
+
+def feed_targets(author_id, category_id):
+    """
+    Return the IDs of the users whose materialized feed receives the stories
+    of `author_id` in `category_id`.
+
+    These are the subscribers of the category and the followers of the
+    author. Users subscribed to all categories are served straight from the
+    Story table and never materialized. Subscribers are matched with
+    top-level JSON containment, which the GIN index on personal_settings
+    answers without scanning every user's settings.
+    """
+    UserSetting = apps.get_model('users', 'UserSetting')
+    Follow = apps.get_model('users', 'Follow')
+
+    target_ids = set(
+        Follow.objects.filter(followed_id=author_id, deleted_at__isnull=True)
+        .values_list("follower_id", flat=True)
+    )
+    if category_id is not None:
+        target_ids |= set(
+            UserSetting.objects.filter(
+                Q(personal_settings__contains={
+                    "favorite_categories": [str(category_id)]})
+                | Q(personal_settings__contains={
+                    "favorite_categories": [category_id]})
+            ).values_list("user_id", flat=True)
+        )
+    target_ids.discard(author_id)
+    return target_ids
+
+
+def push_story(story):
+    """
+    Fan a new story out to the warm feeds of its target users.
+
+    LPUSHX only touches feeds that already exist; cold users are backfilled
+    from the database on their next read instead.
+    """
+    target_ids = feed_targets(story.user_id, story.category_id)
+    if not target_ids:
+        return 0
+
+    max_length = settings.FEED_MAX_LENGTH
+    redis_conn = get_redis_connection("default")
+    pipe = redis_conn.pipeline(transaction=False)
+    for user_id in target_ids:
+        key = _feed_key(user_id)
+        pipe.lpushx(key, story.id)
+        pipe.ltrim(key, 0, max_length - 1)
+    pipe.execute()
+    logger.info(
+        f'Fanned story {story.id} out to {len(target_ids)} candidate feeds')
+    return len(target_ids)
+
+
+def pull_story(story_id, author_id, category_id):
+    """
+    Remove a deleted or flagged story from the warm feeds it was pushed to.
+
+    Keeps feed pages full and `llen` totals exact, since hydration would
+    otherwise silently drop the story from its page.
+    """
+    target_ids = feed_targets(author_id, category_id)
+    if not target_ids:
+        return 0
+
+    redis_conn = get_redis_connection("default")
+    pipe = redis_conn.pipeline(transaction=False)
+    for user_id in target_ids:
+        pipe.lrem(_feed_key(user_id), 0, story_id)
+    pipe.execute()
+    logger.info(
+        f'Pulled story {story_id} from {len(target_ids)} candidate feeds')
+    return len(target_ids)
+
+
+def invalidate_feed(user_id):
+    """
+    Drop a user's materialized feed so it is rebuilt on the next read.
+    """
+    get_redis_connection("default").delete(_feed_key(user_id))
+    logger.debug(f'Invalidated feed for user {user_id}')
+
+
+def backfill_feed(user_id, favorite_categories):
+    """
+    Materialize a cold user's feed from the database.
+    """
+    story_ids = list(
+        feed_queryset(user_id, favorite_categories)
+        .order_by("-created_at", "-id")
+        .values_list("id", flat=True)[:settings.FEED_MAX_LENGTH]
+    )
+    redis_conn = get_redis_connection("default")
+    key = _feed_key(user_id)
+    pipe = redis_conn.pipeline()
+    pipe.delete(key)
+    if story_ids:
+        pipe.rpush(key, *story_ids)
+        pipe.expire(key, settings.FEED_TTL_SECONDS)
+    pipe.execute()
+    logger.info(f'Backfilled feed for user {user_id} with {len(story_ids)} stories')
+
+
+def get_feed(user):
+    """
+    Return the user's materialized feed as a paginator-compatible sequence.
+
+    Returns None when the feed is not materialized for this user (no settings,
+    or subscribed to all categories); callers then fall back to the database.
+    """
+    favorite_categories = _favorite_categories(user.id)
+    if not favorite_categories or ALL_CATEGORIES in favorite_categories:
+        return None
+
+    redis_conn = get_redis_connection("default")
+    key = _feed_key(user.id)
+    if not redis_conn.exists(key):
+        backfill_feed(user.id, favorite_categories)
+    else:
+        redis_conn.expire(key, settings.FEED_TTL_SECONDS)
+
+    def fetch(start, stop):
+        if stop <= start:
+            return []
+        story_ids = [int(story_id) for story_id in
+                     redis_conn.lrange(key, start, stop - 1)]
+        return hydrate_stories(
+            story_ids,
+            Story.active_unflagged_objects.active_and_unflagged()
+            .select_related("user", "category")
+            .prefetch_related("multimedia"),
+        )
+
+    return LazySequence(lambda: redis_conn.llen(key), fetch)
+
+
+# stories/feeds.py
@@ -0,0 +1,116 @@
+import logging
+import time
+from django_redis import get_redis_connection
+from utils.pagination import LazySequence
+
+# Set up the logger for this module
+logger = logging.getLogger('app_logger')
+
+# Redis keys
+BUCKET_KEY = "trending:hashtags:{window}:bucket:{bucket}"
+WINDOW_KEY = "trending:hashtags:{window}"
+
+# Sliding windows as (bucket size in seconds, number of buckets)
+WINDOWS = {
+    "1h": (5 * 60, 12),
+    "24h": (60 * 60, 24),
+    "7d": (6 * 60 * 60, 28),
+}
+
+
+def _bucket_key(window, bucket):
+    return BUCKET_KEY.format(window=window, bucket=bucket)
+
+
+def _window_key(window):
+    return WINDOW_KEY.format(window=window)
+
+
+def _window_buckets(window, now):
+    """
+    Return the bucket numbers covering `window`, current bucket last.
+    """
+    bucket_size, bucket_count = WINDOWS[window]
+    current = int(now // bucket_size)
+    return range(current - bucket_count + 1, current + 1)
+
+
+def record_hashtag_changes(added=(), removed=(), occurred_at=None):
+    """
+    Fold a story's hashtag diff into the bucketed windows.
+
+    Added hashtags count +1 in the bucket of `occurred_at`. `removed` holds
+    `(name, added_at)` pairs, and each counts -1 in the bucket its +1 went
+    to, so edits and deletions take a story back out of exactly the windows
+    it was counted in. Removals whose bucket has already slid out of a
+    window, or that were never counted (no `added_at`), are skipped there.
+    """
+    if not added and not removed:
+        return
+    try:
+        occurred_at = occurred_at or time.time()
+        redis_conn = get_redis_connection("default")
+        pipe = redis_conn.pipeline(transaction=False)
+        for window, (bucket_size, bucket_count) in WINDOWS.items():
+            oldest = _window_buckets(window, occurred_at)[0]
+            changes = [(name, 1, occurred_at) for name in added] + [
+                (name, -1, added_at) for name, added_at in removed
+                if added_at is not None]
+            for name, delta, counted_at in changes:
+                bucket = int(counted_at // bucket_size)
+                if bucket < oldest:
+                    continue
+                key = _bucket_key(window, bucket)
+                pipe.zincrby(key, delta, name)
+                # A bucket is useless once it has slid out of its window
+                pipe.expireat(key, (bucket + bucket_count + 1) * bucket_size)
+        pipe.execute()
+        logger.debug(
+            f'Recorded hashtag changes: +{len(added)} -{len(removed)}')
+    except Exception as e:
+        logger.error(f'Error recording hashtag changes: {e}')
+
+
+def refresh_hashtag_windows(now=None):
+    """
+    Roll the live buckets of every window up into one sorted set per window.
+
+    Expired buckets have already been dropped by Redis, and hashtags whose
+    total fell to zero or below are removed from the rolled-up set.
+    """
+    now = now or time.time()
+    redis_conn = get_redis_connection("default")
+    # MULTI/EXEC, so readers never see a half-built window
+    pipe = redis_conn.pipeline()
+    for window in WINDOWS:
+        key = _window_key(window)
+        bucket_keys = [_bucket_key(window, bucket)
+                       for bucket in _window_buckets(window, now)]
+        pipe.zunionstore(key, bucket_keys)
+        pipe.zremrangebyscore(key, "-inf", 0)
+    pipe.execute()
+    logger.info('Trending hashtag windows refreshed')
+
+
+def hashtag_window_sequence(window):
+    """
+    Return the hashtags trending in `window` as a paginator-compatible sequence.
+
+    Every page is one ZREVRANGE on the rolled-up set.
+    """
+    redis_conn = get_redis_connection("default")
+    key = _window_key(window)
+
+    def fetch(start, stop):
+        if stop <= start:
+            return []
+        return [
+            {"name": name.decode(), "stories_count": int(score)}
+            for name, score in redis_conn.zrevrange(
+                key, start, stop - 1, withscores=True)
+        ]
+
+    return LazySequence(lambda: redis_conn.zcard(key), fetch)
+
+
+# stories/hashtag_trends.py
@@ -0,0 +1,393 @@
+import logging
+import time
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django_redis import get_redis_connection
+from elasticsearch.helpers import bulk, parallel_bulk
+from redis.exceptions import LockNotOwnedError
+from .documents import StoryDocument
+from .models import Story
+
+# Set up the logger for this module
+logger = logging.getLogger('app_logger')
+
+# Redis keys
+REBUILD_TARGET_KEY = "search:stories:rebuild_target"
+PENDING_KEY = "search:stories:pending"
+FLUSH_LOCK_KEY = "search:stories:flush_lock"
+METRICS_KEY = "search:stories:metrics"
+RETRIES_KEY = "search:stories:retries"
+
+
+def indexing_queryset():
+    """
+    Stories with every relation StoryDocument.prepare() reads joined in.
+    """
+    return Story.objects.select_related("user", "category", "parent_story")
+
+
+def story_actions(queryset, index=None, chunk_size=None):
+    """
+    Yield bulk index actions for `queryset` (or a list of stories), streamed
+    in chunks.
+    """
+    document = StoryDocument()
+    index = index or document._index._name
+    if hasattr(queryset, "iterator"):
+        queryset = queryset.iterator(chunk_size=chunk_size or 2000)
+    for story in queryset:
+        yield {
+            "_op_type": "index",
+            "_index": index,
+            "_id": document.generate_id(story),
+            "_source": document.prepare(story),
+        }
+
+
+def _closing_connection(actions):
+    """
+    Yield `actions`, then close the Django DB connection of the consuming
+    thread.
+
+    parallel_bulk reads its actions on the thread pool's feeder thread, so
+    the queryset iterator opens a connection there that nothing else would
+    ever close.
+    """
+    try:
+        yield from actions
+    finally:
+        connection.close()
+
+
+def refresh_param():
+    """
+    The `refresh` argument for single-story writes under ES_REFRESH_POLICY.
+    """
+    return StoryDocument.django.auto_refresh
+
+
+def bulk_index_stories(queryset=None, index=None, chunk_size=None,
+                       thread_count=None, suspend_refresh=True):
+    """
+    Index stories through parallel bulk requests.
+
+    With `suspend_refresh` the index's periodic refresh is turned off for
+    the run and the index is refreshed once at the end. Returns
+    `(indexed, failed)`. Individual failures are logged and counted rather
+    than raised, so one bad document does not abort the run.
+    """
+    queryset = indexing_queryset() if queryset is None else queryset
+    chunk_size = chunk_size or settings.ES_BULK_CHUNK_SIZE
+    thread_count = thread_count or settings.ES_BULK_THREAD_COUNT
+    index = index or StoryDocument._index._name
+    client = StoryDocument._get_connection()
+
+    if suspend_refresh:
+        client.indices.put_settings(
+            index=index, body={"index": {"refresh_interval": "-1"}})
+    indexed = failed = 0
+    started = time.time()
+    try:
+        for ok, item in parallel_bulk(
+            client,
+            _closing_connection(story_actions(queryset, index, chunk_size)),
+            thread_count=thread_count,
+            chunk_size=chunk_size,
+            raise_on_error=False,
+            raise_on_exception=False,
+        ):
+            if ok:
+                indexed += 1
+            else:
+                failed += 1
+                logger.error(f'Failed to index story document: {item}')
+    finally:
+        if suspend_refresh:
+            client.indices.put_settings(index=index, body={
+                "index": {"refresh_interval": settings.ES_REFRESH_INTERVAL}})
+            client.indices.refresh(index=index)
+
+    elapsed = max(time.time() - started, 1e-6)
+    logger.info(
+        f'Bulk indexed {indexed} stories ({failed} failed) in {elapsed:.1f}s, '
+        f'{indexed / elapsed:.0f} docs/sec with {thread_count} threads '
+        f'of {chunk_size}-document chunks')
+    return indexed, failed
+
+
+def queue_index_update(story_id):
+    """
+    Mark a story as needing a search index update.
+
+    Pending stories live in a sorted set scored by when they were first
+    marked, so a burst of writes to one story collapses into one update and
+    the flusher can measure index lag.
+    """
+    get_redis_connection("default").zadd(
+        PENDING_KEY, {story_id: time.time()}, nx=True)
+    logger.debug(f'Queued search index update for story {story_id}')
+
+
+def _flush_actions(story_ids, indices):
+    """
+    Bulk actions carrying the latest state of each story to every index.
+    """
+    stories = indexing_queryset().in_bulk(story_ids)
+    for index in indices:
+        # Hard-deleted stories lose their document
+        deleted = [{"_op_type": "delete", "_index": index, "_id": story_id}
+                   for story_id in story_ids if story_id not in stories]
+        yield from deleted
+        yield from story_actions(list(stories.values()), index)
+
+
+def _requeue_failed(redis_conn, story_ids, errors):
+    """
+    Put the stories of failed bulk items back on the pending set, each up to
+    ES_INDEX_FLUSH_MAX_RETRIES times in a row, and return their IDs.
+
+    Retries are scored now, so they queue behind the updates already
+    pending instead of being picked again by the next batch.
+    """
+    failed = set()
+    for error in errors:
+        (item,) = error.values()
+        failed.add(int(item["_id"]))
+        logger.error(
+            f'Failed to update story {item["_id"]} in {item.get("_index")}: '
+            f'{item.get("status")} {item.get("error")}')
+
+    succeeded = [story_id for story_id in story_ids if story_id not in failed]
+    if succeeded:
+        redis_conn.hdel(RETRIES_KEY, *succeeded)
+    retries = {}
+    for story_id in sorted(failed):
+        attempts = redis_conn.hincrby(RETRIES_KEY, story_id, 1)
+        if attempts <= settings.ES_INDEX_FLUSH_MAX_RETRIES:
+            retries[story_id] = time.time()
+        else:
+            redis_conn.hdel(RETRIES_KEY, story_id)
+            logger.error(
+                f'Dropping search index update for story {story_id} after '
+                f'{attempts - 1} retries')
+    if retries:
+        redis_conn.zadd(PENDING_KEY, retries, nx=True)
+    return failed
+
+
+def _flush_batch(redis_conn, batch_size):
+    """
+    Send one batch of pending story updates to Elasticsearch in one bulk
+    request and return the number of stories flushed.
+
+    Stories are taken off the set before their rows are read, so a write
+    landing mid-flush re-queues the story instead of being lost. On failure
+    the batch is put back; stories whose document alone failed are retried
+    a few times.
+    """
+    pending = redis_conn.zrange(PENDING_KEY, 0, batch_size - 1,
+                                withscores=True)
+    if not pending:
+        return 0
+    redis_conn.zrem(PENDING_KEY, *[member for member, _ in pending])
+    story_ids = [int(member) for member, _ in pending]
+
+    indices = [StoryDocument._index._name]
+    target = rebuild_target()
+    if target:
+        indices.append(target)
+
+    started = time.time()
+    try:
+        _, errors = bulk(
+            StoryDocument._get_connection(),
+            _flush_actions(story_ids, indices),
+            chunk_size=settings.ES_BULK_CHUNK_SIZE,
+            raise_on_error=False,
+            refresh=refresh_param(),
+        )
+    except Exception:
+        redis_conn.zadd(PENDING_KEY, dict(pending), nx=True)
+        raise
+    # Deleting a document that was never indexed is not a failure
+    errors = [error for error in errors
+              if error.get("delete", {}).get("status") != 404]
+    failed = _requeue_failed(redis_conn, story_ids, errors)
+
+    finished = time.time()
+    lag = finished - min(score for _, score in pending)
+    pipe = redis_conn.pipeline()
+    pipe.hset(METRICS_KEY, mapping={
+        "last_flush_at": finished,
+        "last_batch_size": len(story_ids),
+        "last_flush_seconds": finished - started,
+        "last_lag_seconds": lag,
+    })
+    pipe.hincrby(METRICS_KEY, "flushed_total", len(story_ids))
+    pipe.hincrby(METRICS_KEY, "failed_total", len(failed))
+    pipe.execute()
+    logger.info(
+        f'Flushed {len(story_ids)} story updates to Elasticsearch in '
+        f'{finished - started:.3f}s, lag {lag:.3f}s, {len(failed)} failed')
+    return len(story_ids)
+
+
+def flush_index_queue(batch_size=None, time_budget=None):
+    """
+    Send the pending story updates to Elasticsearch, one bulk request per
+    batch.
+
+    Batches keep going while updates are pending, for up to `time_budget`
+    seconds, so the lag stays bounded under sustained writes. A Redis lock
+    keeps one flusher running at a time. Returns the number of stories
+    flushed.
+    """
+    batch_size = batch_size or settings.ES_INDEX_FLUSH_BATCH_SIZE
+    time_budget = time_budget or settings.ES_INDEX_FLUSH_TIME_BUDGET
+    redis_conn = get_redis_connection("default")
+    lock = redis_conn.lock(FLUSH_LOCK_KEY, timeout=60, blocking_timeout=0)
+    if not lock.acquire():
+        return 0
+
+    flushed = 0
+    deadline = time.time() + time_budget
+    try:
+        while True:
+            count = _flush_batch(redis_conn, batch_size)
+            flushed += count
+            if count < batch_size or time.time() >= deadline:
+                break
+            lock.extend(60, replace_ttl=True)
+    except LockNotOwnedError:
+        # A batch outlived the lock; another flusher may hold it now
+        logger.warning('Search index flush lock expired, stopping this run')
+    finally:
+        try:
+            lock.release()
+        except LockNotOwnedError:
+            pass
+    return flushed
+
+
+def index_queue_status():
+    """
+    Return the pending update count and the metrics of the last flush.
+    """
+    redis_conn = get_redis_connection("default")
+    status = {key.decode(): float(value) for key, value in
+              redis_conn.hgetall(METRICS_KEY).items()}
+    status["pending"] = redis_conn.zcard(PENDING_KEY)
+    oldest = redis_conn.zrange(PENDING_KEY, 0, 0, withscores=True)
+    status["oldest_pending_seconds"] = (
+        time.time() - oldest[0][1] if oldest else 0.0)
+    return status
+
+
+def index_story_now(story_id):
+    """
+    Index one story synchronously and wait until searches can see it.
+
+    For read-your-writes on an author's own edit, whatever the refresh
+    policy; the queued flush still follows and also updates the index being
+    rebuilt, if any.
+    """
+    actions = list(story_actions(indexing_queryset().filter(id=story_id)))
+    if actions:
+        bulk(StoryDocument._get_connection(), actions, refresh="wait_for")
+        logger.debug(f'Indexed story {story_id} with refresh=wait_for')
+
+
+def _generation_name(alias):
+    return f"{alias}-{timezone.now():%Y%m%d%H%M%S}"
+
+
+def rebuild_target():
+    """
+    Return the name of the index being rebuilt, or None.
+    """
+    target = get_redis_connection("default").get(REBUILD_TARGET_KEY)
+    return target.decode() if target else None
+
+
+def _swap_alias(client, alias, new_index):
+    """
+    Point `alias` at `new_index` in one atomic update_aliases call.
+
+    A concrete index still holding the alias's name (the layout before
+    aliases were introduced) is dropped in the same call.
+    """
+    actions = [{"add": {"index": new_index, "alias": alias}}]
+    if client.indices.exists_alias(name=alias):
+        for index in client.indices.get_alias(name=alias):
+            actions.insert(0, {"remove": {"index": index, "alias": alias}})
+    elif client.indices.exists(index=alias):
+        actions.insert(0, {"remove_index": {"index": alias}})
+    client.indices.update_aliases(body={"actions": actions})
+
+
+def _drop_old_generations(client, alias, keep):
+    """
+    Delete all but the `keep` newest generations not behind the alias.
+    """
+    live = set(client.indices.get_alias(name=alias))
+    generations = sorted(client.indices.get(index=f"{alias}-*"), reverse=True)
+    for index in [index for index in generations if index not in live][keep:]:
+        client.indices.delete(index=index, ignore=[404])
+        logger.info(f'Deleted old stories index generation {index}')
+
+
+def rebuild_index(chunk_size=None, thread_count=None):
+    """
+    Blue/green rebuild of the stories index behind its alias.
+
+    A new timestamped generation is created with the document's current
+    mappings and analyzers, bulk-loaded with refresh disabled and no
+    replicas, then restored, caught up and swapped in atomically. Searches
+    keep hitting the old generation until the swap. Returns the new index.
+    """
+    document = StoryDocument()
+    alias = document._index._name
+    new_index = _generation_name(alias)
+    client = StoryDocument._get_connection()
+    index_settings = StoryDocument.Index.settings
+
+    logger.info(f'Rebuilding stories index into {new_index}')
+    document._index.clone(name=new_index).create()
+    client.indices.put_settings(index=new_index, body={
+        "index": {"refresh_interval": "-1", "number_of_replicas": 0}})
+
+    # Queued flushes write to the new index from here on; the replay below
+    # covers the writes that raced with setting the marker.
+    redis_conn = get_redis_connection("default")
+    redis_conn.set(REBUILD_TARGET_KEY, new_index)
+    started = timezone.now()
+    try:
+        # Refresh stays off for the whole load and is restored below
+        bulk_index_stories(index=new_index, chunk_size=chunk_size,
+                           thread_count=thread_count, suspend_refresh=False)
+        bulk_index_stories(
+            indexing_queryset().filter(updated_at__gte=started),
+            index=new_index, chunk_size=chunk_size, thread_count=thread_count,
+            suspend_refresh=False)
+
+        client.indices.put_settings(index=new_index, body={"index": {
+            "refresh_interval": index_settings.get(
+                "refresh_interval", settings.ES_REFRESH_INTERVAL),
+            "number_of_replicas": index_settings.get("number_of_replicas", 1),
+        }})
+        client.indices.refresh(index=new_index)
+        _swap_alias(client, alias, new_index)
+    except Exception:
+        logger.error(f'Rebuild into {new_index} failed, keeping the old index')
+        client.indices.delete(index=new_index, ignore=[404])
+        raise
+    finally:
+        redis_conn.delete(REBUILD_TARGET_KEY)
+
+    logger.info(f'Alias {alias} now points at {new_index}')
+    _drop_old_generations(client, alias, settings.ES_INDEX_GENERATIONS_KEPT)
+    return new_index
+
+
+# stories/indexing.py
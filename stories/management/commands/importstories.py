@@ -1,101 +1,267 @@
-from django.core.management.base import BaseCommand
 import json
-from stories.neo_models import StoryNode, Storyline, Hashtag
 import os
+import time
+import uuid
 from datetime import datetime
-from neomodel.exceptions import DoesNotExist
-from stories.utils import extract_hashtags
-from neomodel.exceptions import DoesNotExist as HashtagDoesNotExist
+from django.core.management.base import BaseCommand
 from neomodel import db
+from stories.loaders import cache_storylines
+from stories.neo_queries import refresh_degree_counts
+from stories.models import normalize_hashtags
+
+# Storyline IDs are derived from the root story, so re-running an import
+# merges into the storylines it created before
+STORYLINE_NAMESPACE = uuid.UUID("6f1c1e64-3f0e-4a43-9a55-1b0b5a3c8f1e")
+
+# Nodes first, so the edges of the second query find every node of the batch
+IMPORT_NODES_QUERY = """
+UNWIND $rows AS row
+MERGE (story:StoryNode {story_id: row.story_id})
+ON CREATE SET story.node_id = replace(randomUUID(), '-', '')
+SET story.event_occurred_at = row.event_occurred_at
+WITH story, row
+CALL {
+    WITH story, row
+    WITH story, row WHERE row.storyline IS NOT NULL
+    MERGE (storyline:Storyline {id: row.storyline.id})
+    ON CREATE SET storyline += row.storyline,
+                  storyline.created_at = $now,
+                  storyline.updated_at = $now
+}
+CALL {
+    WITH story, row
+    UNWIND row.hashtags AS name
+    MERGE (hashtag:Hashtag {name: name})
+    MERGE (story)-[:HAS_HASHTAG]->(hashtag)
+}
+RETURN count(story)
+"""
+
+IMPORT_EDGES_QUERY = """
+UNWIND $rows AS row
+MATCH (story:StoryNode {story_id: row.story_id})
+CALL {
+    WITH story, row
+    MATCH (storyline:Storyline {id: row.storyline_id})
+    MERGE (story)-[:PART_OF]->(storyline)
+}
+CALL {
+    WITH story, row
+    MATCH (parent:StoryNode {story_id: row.parent_id})
+    MERGE (parent)-[:FOLLOWS]->(story)
+    WITH parent, story, row WHERE row.storyline_id IS NULL
+    MATCH (parent)-[:PART_OF]->(storyline:Storyline)
+    MERGE (story)-[:PART_OF]->(storyline)
+}
+RETURN row.story_id, [(story)-[:PART_OF]->(storyline:Storyline) | storyline.id]
+"""
+
+# Parents imported before this run (e.g. before the resume checkpoint)
+PARENT_STORYLINES_QUERY = """
+UNWIND $story_ids AS story_id
+MATCH (parent:StoryNode {story_id: story_id})
+OPTIONAL MATCH (parent)-[:PART_OF]->(storyline:Storyline)
+RETURN story_id, head(collect(storyline.id))
+"""
+
+
+def iter_json_array(file, chunk_size=1 << 16):
+    """
+    Yield the items of a top-level JSON array without loading the whole file.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if started and buffer.startswith(","):
+            buffer = buffer[1:].lstrip()
+        if not started and buffer.startswith("["):
+            buffer = buffer[1:].lstrip()
+            started = True
+        if started and buffer.startswith("]"):
+            return
+        if buffer and started:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                buffer = buffer[end:]
+                yield item
+                continue
+        elif eof:
+            return
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
 
 
 class Command(BaseCommand):
     help = "Import stories from stories_processed.json to StoryNode in Neo4j"
 
-    def handle(self, *args, **kwargs):
-        # Path to the stories_processed.json file
-        file_path = os.path.join(
-            os.path.dirname(__file__),
-            "..",
-            "..",
-            "data",
-            "processed",
-            "stories_processed.json",
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=os.path.join(
+                os.path.dirname(__file__),
+                "..",
+                "..",
+                "data",
+                "processed",
+                "stories_processed.json",
+            ),
+            help="Path of the JSON archive to import",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of stories written per transaction",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the records already imported by a previous run",
         )
 
-        # Load the JSON data
+    def handle(self, *args, **options):
+        file_path = options["file"]
+        batch_size = options["batch_size"]
+        self.checkpoint_path = f"{file_path}.checkpoint"
+
+        skip = 0
+        if options["resume"] and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as checkpoint:
+                skip = int(checkpoint.read().strip() or 0)
+            self.stdout.write(f"Resuming after {skip} records")
+
+        # story_id -> storyline id, for parents seen by this run
+        self.storylines = {}
+        # parent_id -> [(position, record)] of children seen before the parent
+        self.waiting = {}
+        self.batch = []
+        self.imported = 0
+        self.started = time.time()
+
         with open(file_path, "r") as file:
-            data = json.load(file)
+            for position, story_data in enumerate(iter_json_array(file)):
+                if position < skip:
+                    continue
+                self.add(position, story_data)
+                if len(self.batch) >= batch_size:
+                    self.flush(next_position=position + 1)
+
+        # Parents missing from both the archive and the graph: their
+        # subtrees are written without a storyline, parents before children
+        self.resolve_parents()
+        parked = {story_data["pk"] for children in self.waiting.values()
+                  for _, story_data in children}
+        for parent_id in [parent_id for parent_id in self.waiting
+                          if parent_id not in parked]:
+            self.storylines[parent_id] = None
+            for position, story_data in self.waiting.pop(parent_id):
+                self.add(position, story_data)
+        self.flush()
+
+        # Cache PART_OF and HAS_HASHTAG degrees on every node
+        refresh_degree_counts()
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully imported {self.imported} stories to Neo4j"))
+
+    def add(self, position, story_data):
+        """
+        Queue a record for the next batch, or park it until its parent is seen.
+        """
+        parent_id = story_data["fields"]["parent_story"]
+        if parent_id is not None and parent_id not in self.storylines:
+            self.waiting.setdefault(parent_id, []).append((position, story_data))
+            return
 
-        # First pass: Create all StoryNode instances and set up Storyline relationships
-        for story_data in data:
-            story = story_data["fields"]
+        ready = [(position, story_data)]
+        while ready:
+            position, story_data = ready.pop()
             story_id = story_data["pk"]
+            parent_id = story_data["fields"]["parent_story"]
+            if parent_id is None:
+                self.storylines[story_id] = uuid.uuid5(
+                    STORYLINE_NAMESPACE, str(story_id)).hex
+            else:
+                self.storylines[story_id] = self.storylines[parent_id]
+            self.batch.append((position, story_data))
+            # Children that arrived before this story can be placed now
+            ready.extend(self.waiting.pop(story_id, []))
 
-            # Check if StoryNode with the same story_id already exists
-            try:
-                existing_node = StoryNode.nodes.get(story_id=story_id)
-                continue  # Skip this iteration if node already exists
-            except DoesNotExist:
-                pass  # Node doesn't exist, so we'll create it
+    def resolve_parents(self):
+        """
+        Release the children parked on parents that are already in the graph.
+        """
+        if not self.waiting:
+            return
+        rows, _ = db.cypher_query(
+            PARENT_STORYLINES_QUERY, {"story_ids": list(self.waiting)})
+        for parent_id, storyline_id in rows:
+            self.storylines[parent_id] = storyline_id
+            for position, story_data in self.waiting.pop(parent_id, []):
+                self.add(position, story_data)
 
+    def build_row(self, story_data):
+        story = story_data["fields"]
+        story_id = story_data["pk"]
+        row = {
+            "story_id": story_id,
+            "parent_id": story["parent_story"],
             # Convert ISO format to datetime
-            event_date = datetime.fromisoformat(story["created_at"])
-            story_node = StoryNode(story_id=story_id, event_occurred_at=event_date)
-            story_node.save()
-
-            # Determine Storyline association
-            if not story["parent_story"]:
-                # Create a new Storyline node
-                description = story["body"][:200]
-                summary = story["title"]
-                subject = story["slug"]
-                hashtags = "#".join(story["slug"].split("-"))
-
-                storyline = Storyline(
-                    description=description,
-                    summary=summary,
-                    subject=subject,
-                    hashtags=hashtags,
-                )
-                storyline.save()
-                story_node.belongs_to_storyline.connect(storyline)
-            else:
-                # Associate with the parent's Storyline
-                parent_node = StoryNode.nodes.get(story_id=story["parent_story"])
-                parent_storyline = parent_node.belongs_to_storyline.all()[0]
-                story_node.belongs_to_storyline.connect(parent_storyline)
-
-        # Second pass: Set up previous_story relationships
-        for story_data in data:
-            story = story_data["fields"]
-            story_id = story_data["pk"]
+            "event_occurred_at": datetime.fromisoformat(
+                story["created_at"]).timestamp(),
+            "hashtags": normalize_hashtags(story["body"]),
+            "storyline_id": self.storylines.get(story_id),
+            "storyline": None,
+        }
+        if story["parent_story"] is None:
+            row["storyline"] = {
+                "id": row["storyline_id"],
+                "description": story["body"][:200],
+                "summary": story["title"],
+                "subject": story["slug"],
+                "hashtags": "#".join(story["slug"].split("-")),
+            }
+        return row
 
-            story_node = StoryNode.nodes.get(story_id=story_id)
+    def flush(self, next_position=None):
+        """
+        Write the current batch in one transaction and save the checkpoint.
+        """
+        if next_position is not None:
+            # Keeps a resumed run from parking every child of a parent
+            # imported before the checkpoint
+            self.resolve_parents()
+        if self.batch:
+            rows = [self.build_row(story_data) for _, story_data in self.batch]
+            with db.transaction:
+                db.cypher_query(
+                    IMPORT_NODES_QUERY, {"rows": rows, "now": time.time()})
+                storylines, _ = db.cypher_query(
+                    IMPORT_EDGES_QUERY, {"rows": rows})
+            cache_storylines(dict(storylines))
+            self.imported += len(rows)
+            self.batch = []
 
-            # Handle previous_story relationships
-            if story["parent_story"]:
-                parent_node = StoryNode.nodes.get(story_id=story["parent_story"])
-                story_node.previous_story.connect(parent_node)
+            elapsed = time.time() - self.started
+            self.stdout.write(
+                f"Imported {self.imported} stories "
+                f"({self.imported / elapsed:.0f} stories/s)")
 
-        # Populate hashtags
-        for story_data in data:
-            story_id = story_data["pk"]
-            hashtags = extract_hashtags(story_data["fields"]["body"])
-            story_node = StoryNode.nodes.get(story_id=story_id)
-            for hashtag_name in hashtags:
-                try:
-                    hashtag_node = Hashtag.nodes.get(name=hashtag_name)
-                except HashtagDoesNotExist:
-                    hashtag_node = Hashtag(name=hashtag_name).save()
-
-                story_node.hashtags.connect(hashtag_node)
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Connected hashtag "{hashtag_name}" to story "{story_data["fields"]["title"]}"'
-                    )
-                )
-        self.stdout.write(self.style.SUCCESS("Successfully imported stories to Neo4j"))
+        if next_position is not None:
+            # Parked children have not been written yet
+            pending = [position for children in self.waiting.values()
+                       for position, _ in children]
+            with open(self.checkpoint_path, "w") as checkpoint:
+                checkpoint.write(str(min(pending + [next_position])))
 
 
 # stories/management/commands/importstories.py
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from neomodel import db
+from stories.neo_db import write_session
+from stories.neo_queries import refresh_degree_counts
+
+# Moves the edges of mixed-case Hashtag nodes onto the lowercase node the
+# sync path writes to, then drops the mixed-case node
+MERGE_HASHTAGS_QUERY = """
+MATCH (hashtag:Hashtag)
+WHERE hashtag.name <> toLower(hashtag.name)
+WITH hashtag LIMIT $batch_size
+MERGE (target:Hashtag {name: toLower(hashtag.name)})
+WITH hashtag, target
+CALL {
+    WITH hashtag, target
+    MATCH (story:StoryNode)-[edge:HAS_HASHTAG]->(hashtag)
+    MERGE (story)-[merged:HAS_HASHTAG]->(target)
+    ON CREATE SET merged.added_at = edge.added_at
+    DELETE edge
+}
+WITH hashtag, target.name AS name
+DETACH DELETE hashtag
+RETURN DISTINCT name
+"""
+
+
+class Command(BaseCommand):
+    help = "Merge mixed-case Hashtag nodes in Neo4j under their lowercase names"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of hashtag nodes merged per transaction",
+        )
+
+    def handle(self, *args, **options):
+        merged = set()
+        while True:
+            with write_session():
+                rows, _ = db.cypher_query(
+                    MERGE_HASHTAGS_QUERY,
+                    {"batch_size": options["batch_size"]})
+            if not rows:
+                break
+            merged.update(name for name, in rows)
+            self.stdout.write(f"Merged hashtags into {len(merged)} names")
+
+        if merged:
+            refresh_degree_counts(merged, [])
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully merged mixed-case hashtags into {len(merged)} "
+            f"lowercase hashtags"))
+
+
+# stories/management/commands/mergehashtags.py
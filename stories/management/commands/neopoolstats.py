@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from stories.neo_db import pool_stats
+
+
+class Command(BaseCommand):
+    help = "Report Neo4j session and pool usage per worker process"
+
+    def handle(self, *args, **options):
+        stats = pool_stats()
+        if not stats:
+            self.stdout.write("No pool metrics reported yet")
+            return
+
+        for process, counters in sorted(stats.items()):
+            sessions = counters.get("sessions", 0)
+            average = counters.get("total_seconds", 0) / sessions if sessions else 0
+            self.stdout.write(
+                f"{process}: {sessions:.0f} sessions "
+                f"(read {counters.get('read_sessions', 0):.0f}, "
+                f"write {counters.get('write_sessions', 0):.0f}), "
+                f"{counters.get('errors', 0):.0f} errors, "
+                f"avg {average * 1000:.1f}ms, "
+                f"max {counters.get('max_seconds', 0) * 1000:.1f}ms, "
+                f"peak {counters.get('peak_in_use', 0):.0f}"
+                f"/{counters.get('pool_size', 0):.0f} connections")
+
+
+# stories/management/commands/neopoolstats.py
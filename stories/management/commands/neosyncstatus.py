@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from stories.neo_sync import drain_queue, sync_status
+
+
+class Command(BaseCommand):
+    help = "Report the Postgres to Neo4j sync queue and its lag"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--drain",
+            action="store_true",
+            help="Drain the queue in this process before reporting",
+        )
+
+    def handle(self, *args, **options):
+        if options["drain"]:
+            processed = drain_queue()
+            self.stdout.write(f"Synced {processed} story changes")
+
+        for key, value in sorted(sync_status().items()):
+            self.stdout.write(f"{key}: {value}")
+
+
+# stories/management/commands/neosyncstatus.py
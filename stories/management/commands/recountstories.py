@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from stories.models import Story
+from stories.counters import recompute_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized like/dislike/view counters on Story from source rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--story-ids",
+            nargs="+",
+            type=int,
+            help="Only recompute the counters of these stories",
+        )
+
+    def handle(self, *args, **kwargs):
+        queryset = Story.objects.all()
+        if kwargs["story_ids"]:
+            queryset = queryset.filter(id__in=kwargs["story_ids"])
+
+        updated = recompute_counters(queryset)
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully recomputed counters for {updated} stories"))
+
+
+# stories/management/commands/recountstories.py
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from stories.indexing import bulk_index_stories, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Reindex every story into Elasticsearch with parallel bulk requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Documents per bulk request (defaults to ES_BULK_CHUNK_SIZE)",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            help="Concurrent bulk requests (defaults to ES_BULK_THREAD_COUNT)",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Build a new index generation and swap the alias to it",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            new_index = rebuild_index(
+                chunk_size=options["chunk_size"],
+                thread_count=options["threads"],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Stories alias swapped to {new_index}"))
+            return
+
+        indexed, failed = bulk_index_stories(
+            chunk_size=options["chunk_size"],
+            thread_count=options["threads"],
+        )
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(
+            f"Indexed {indexed} stories, {failed} failed"))
+
+
+# stories/management/commands/reindexstories.py
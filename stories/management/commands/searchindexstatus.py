@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from stories.indexing import flush_index_queue, index_queue_status
+
+
+class Command(BaseCommand):
+    help = "Report pending Elasticsearch story updates and the flusher's lag"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Flush one batch in this process before reporting",
+        )
+
+    def handle(self, *args, **options):
+        if options["flush"]:
+            flushed = flush_index_queue()
+            self.stdout.write(f"Flushed {flushed} story updates")
+
+        for key, value in sorted(index_queue_status().items()):
+            self.stdout.write(f"{key}: {value}")
+
+
+# stories/management/commands/searchindexstatus.py
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from stories.loaders import cache_storylines
+from stories.neo_db import read_query
+
+STORYLINE_MAP_PAGE_QUERY = """
+MATCH (story:StoryNode)
+WHERE story.story_id > $after
+WITH story ORDER BY story.story_id LIMIT $limit
+RETURN story.story_id, [(story)-[:PART_OF]->(storyline:Storyline) | storyline.id]
+"""
+
+
+class Command(BaseCommand):
+    help = "Warm the Redis story-to-storyline mapping from Neo4j"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of stories read per Cypher query",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        after = -1
+        warmed = 0
+        while True:
+            rows = read_query(
+                STORYLINE_MAP_PAGE_QUERY, {"after": after, "limit": batch_size})
+            if not rows:
+                break
+            cache_storylines(dict(rows))
+            warmed += len(rows)
+            after = rows[-1][0]
+            self.stdout.write(f"Warmed {warmed} stories")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully warmed the storyline mapping for {warmed} stories"))
+
+
+# stories/management/commands/warmstorylines.py
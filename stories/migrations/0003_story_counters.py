@@ -0,0 +1,56 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count_subquery(queryset):
+    counts = (
+        queryset.filter(story=OuterRef("pk"))
+        .order_by()
+        .values("story")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Story = apps.get_model("stories", "Story")
+    Like = apps.get_model("stories", "Like")
+    Dislike = apps.get_model("stories", "Dislike")
+    StoryInteraction = apps.get_model("analytics", "StoryInteraction")
+    Story.objects.update(
+        like_count=_count_subquery(Like.objects.all()),
+        dislike_count=_count_subquery(Dislike.objects.all()),
+        view_count=_count_subquery(
+            StoryInteraction.objects.filter(interaction_type="view")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('stories', '0002_usersearchhistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='dislike_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
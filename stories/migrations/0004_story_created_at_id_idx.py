@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0003_story_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(fields=['-created_at', '-id'], name='story_created_at_id_idx'),
+        ),
+    ]
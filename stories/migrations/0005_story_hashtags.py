@@ -0,0 +1,44 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:40
+
+import re
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+HASHTAG_MAX_LENGTH = 100
+
+
+def backfill_hashtags(apps, schema_editor):
+    Story = apps.get_model("stories", "Story")
+    batch = []
+    for story in Story.objects.only("id", "body").iterator(chunk_size=2000):
+        story.hashtags = sorted({
+            hashtag.lower() for hashtag in HASHTAG_PATTERN.findall(story.body or "")
+            if len(hashtag) <= HASHTAG_MAX_LENGTH})
+        batch.append(story)
+        if len(batch) >= 2000:
+            Story.objects.bulk_update(batch, ["hashtags"])
+            batch = []
+    if batch:
+        Story.objects.bulk_update(batch, ["hashtags"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0004_story_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='hashtags',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=100), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunPython(backfill_hashtags, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='story',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['hashtags'], name='story_hashtags_gin_idx'),
+        ),
+    ]
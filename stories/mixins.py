@@ -1,6 +1,11 @@
 import logging
+from django.db.models import F
 from django.shortcuts import get_object_or_404
+from rest_framework.response import Response
+from utils.serializers import parse_fields_param
+from .indexing import index_story_now
 from .models import Story
+from .pagination import AnchoredWindowPagination
 
 # Set up the logger for this module
 logger = logging.getLogger('app_logger')
@@ -29,4 +34,114 @@ class StoryMixin:
             logger.warning('No story ID or slug provided in request')
             return None
 
+
+class AnchoredWindowMixin:
+    """
+    Lets clients open a story list at a given story: requests with
+    `?around=<story id>` get the window of stories around it instead of a
+    regular page.
+    """
+    window_pagination_class = AnchoredWindowPagination
+
+    @property
+    def paginator(self):
+        anchor_param = self.window_pagination_class.anchor_query_param
+        if (not hasattr(self, "_paginator")
+                and anchor_param in self.request.query_params):
+            self._paginator = self.window_pagination_class()
+        return super().paginator
+
+
+class SearchVisibilityMixin:
+    """
+    Read-your-writes for story edits: with `?refresh=wait_for` the saved
+    story is indexed before the response returns, so the author's next
+    search already sees it.
+    """
+    refresh_query_param = "refresh"
+
+    def wait_for_search_index(self, story):
+        if self.request.query_params.get(self.refresh_query_param) == "wait_for":
+            index_story_now(story.id)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.wait_for_search_index(serializer.instance)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.wait_for_search_index(serializer.instance)
+
+
+class HashtagFilterMixin:
+    """
+    Filter story lists by `?hashtag=` (repeatable; every hashtag must match).
+
+    Served by the GIN index on `Story.hashtags`.
+    """
+    hashtag_query_param = "hashtag"
+
+    def get_hashtag_filters(self):
+        return sorted({
+            hashtag.lstrip("#").lower()
+            for hashtag in self.request.query_params.getlist(
+                self.hashtag_query_param)
+            if hashtag.strip("# ")
+        })
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        hashtags = self.get_hashtag_filters()
+        if hashtags:
+            logger.debug(f'Filtering stories by hashtags {hashtags}')
+            queryset = queryset.filter(hashtags__contains=hashtags)
+        return queryset
+
+
+class StoryProjectionMixin:
+    """
+    List mixin with a `values()` fast path for card-style `?fields=` requests.
+
+    When every requested field is a plain column (or an engagement counter),
+    the page is read with `values()` and serialized from dicts, skipping model
+    instantiation, prefetches and nested lookups entirely.
+    """
+    # Serializer field name -> expression for the engagement counters
+    projection_aliases = {
+        "likes_count": F("like_count"),
+        "dislikes_count": F("dislike_count"),
+    }
+
+    def get_projection_fields(self):
+        if getattr(self, "wants_cursor_pagination", lambda: False)():
+            return None
+        requested = parse_fields_param(self.request)
+        if not requested:
+            return None
+        columns = {
+            field.name for field in Story._meta.concrete_fields
+            if not field.is_relation and field.name not in Story.COUNTER_FIELDS
+        }
+        if not requested <= columns | self.projection_aliases.keys():
+            return None
+        return requested
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_projection_fields()
+        if fields is None:
+            return super().list(request, *args, **kwargs)
+
+        logger.debug(f'Serving projected story list with fields {fields}')
+        aliases = {name: expression for name, expression
+                   in self.projection_aliases.items() if name in fields}
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        rows = queryset.values(*(fields - aliases.keys()), **aliases)
+
+        page = self.paginate_queryset(rows)
+        serializer = self.get_serializer(
+            page if page is not None else rows, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
 # stories/mixins.py
@@ -1,4 +1,7 @@
 import logging
+import re
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.urls import reverse
 from django.conf import settings
@@ -12,6 +15,19 @@ from utils.models import (
 # Set up the logger for this module
 logger = logging.getLogger('app_logger')
 
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+HASHTAG_MAX_LENGTH = 100
+
+
+def normalize_hashtags(text):
+    """
+    Return the unique hashtags of `text`, lowercased and sorted, without '#'.
+    Hashtags longer than HASHTAG_MAX_LENGTH are dropped.
+    """
+    return sorted({
+        hashtag.lower() for hashtag in HASHTAG_PATTERN.findall(text or "")
+        if len(hashtag) <= HASHTAG_MAX_LENGTH})
+
 
 class Category(SoftDeletableModel, TimestampedModel):
     title = models.CharField(max_length=100)
@@ -74,7 +90,19 @@ class Story(FlaggedContentMixin, SoftDeletableModel, TimestampedModel):
         help_text="Date and time when the event/incident was reported to the system.",
     )
 
-    story_node = None  # Temporary attribute for caching
+    # Denormalized engagement counters, maintained by stories.signals
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    dislike_count = models.PositiveIntegerField(default=0, editable=False)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ("like_count", "dislike_count", "view_count")
+
+    # Normalized hashtags of the body, extracted on save
+    hashtags = ArrayField(
+        models.CharField(max_length=HASHTAG_MAX_LENGTH), default=list,
+        blank=True, editable=False)
+
+    storyline_ids = None  # Temporary attribute for caching
 
     # objects = models.Manager()  # Default manager
     objects = StoryManager()
@@ -86,22 +114,16 @@ class Story(FlaggedContentMixin, SoftDeletableModel, TimestampedModel):
 
     @property
     def likes_count(self):
-        logger.debug(f'Calculating likes count for story {self.id}')
-        return self.likes_set.count()
+        return self.like_count
 
     @property
     def dislikes_count(self):
-        logger.debug(f'Calculating dislikes count for story {self.id}')
-        return self.dislikes_set.count()
+        return self.dislike_count
 
     @property
     def trending_score(self):
-        logger.debug(f'Calculating trending score for story {self.id}')
-        likes = self.likes_count
-        dislikes = self.dislikes_count
-        views = self.interactions.filter(interaction_type="view").count()
         # Simple formula: likes - dislikes + views
-        return likes - dislikes + views
+        return self.like_count - self.dislike_count + self.view_count
 
     def __str__(self):
         logger.debug(f'Returning string representation for story {self.id}')
@@ -109,6 +131,34 @@ class Story(FlaggedContentMixin, SoftDeletableModel, TimestampedModel):
 
     class Meta:
         verbose_name_plural = "Stories"
+        indexes = [
+            # Backs keyset pagination over (created_at, id)
+            models.Index(fields=["-created_at", "-id"],
+                         name="story_created_at_id_idx"),
+            # Backs hashtags__contains lookups
+            GinIndex(fields=["hashtags"], name="story_hashtags_gin_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the save signal invalidate the category a story moved out of
+        instance._loaded_category_id = instance.__dict__.get("category_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.hashtags = normalize_hashtags(self.body)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "body" in update_fields:
+            kwargs["update_fields"] = set(update_fields) | {"hashtags"}
+        # Counters are only written through F() updates, so a stale instance
+        # must never overwrite them on a regular save.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         logger.debug(f'Getting absolute URL for story {self.id}')
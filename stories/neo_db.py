@@ -0,0 +1,153 @@
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django_redis import get_redis_connection
+from neomodel import config, db
+
+# Set up the logger for this module
+logger = logging.getLogger('app_logger')
+
+# Redis keys
+POOL_METRICS_KEY = "neo4j:pool:{process}"
+
+
+def configure_driver():
+    """
+    Apply the driver pool settings before neomodel opens its first connection.
+    """
+    config.MAX_CONNECTION_POOL_SIZE = settings.NEO4J_MAX_CONNECTION_POOL_SIZE
+    config.CONNECTION_ACQUISITION_TIMEOUT = (
+        settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT)
+    config.MAX_CONNECTION_LIFETIME = settings.NEO4J_MAX_CONNECTION_LIFETIME
+    logger.debug(
+        f'Neo4j driver pool: max size {config.MAX_CONNECTION_POOL_SIZE}, '
+        f'acquisition timeout {config.CONNECTION_ACQUISITION_TIMEOUT}s, '
+        f'max lifetime {config.MAX_CONNECTION_LIFETIME}s')
+
+
+class PoolMetrics:
+    """
+    Per-process counters of Neo4j session use, flushed to Redis periodically.
+
+    `peak_in_use` against NEO4J_MAX_CONNECTION_POOL_SIZE shows how close a
+    worker process gets to exhausting its pool.
+    """
+
+    FIELDS = ("sessions", "errors", "total_seconds", "max_seconds",
+              "in_use", "peak_in_use")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+        self.reset()
+
+    def reset(self):
+        self.counters = {field: 0 for field in self.FIELDS}
+
+    def acquire(self):
+        with self._lock:
+            self.counters["in_use"] += 1
+            self.counters["peak_in_use"] = max(
+                self.counters["peak_in_use"], self.counters["in_use"])
+
+    def release(self, access_mode, seconds, failed):
+        with self._lock:
+            counters = self.counters
+            counters["in_use"] -= 1
+            counters["sessions"] += 1
+            counters[f"{access_mode}_sessions"] = (
+                counters.get(f"{access_mode}_sessions", 0) + 1)
+            counters["errors"] += int(failed)
+            counters["total_seconds"] += seconds
+            counters["max_seconds"] = max(counters["max_seconds"], seconds)
+            due = (time.time() - self._last_flush
+                   >= settings.NEO4J_POOL_METRICS_INTERVAL)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counters = dict(self.counters)
+            self._last_flush = time.time()
+            in_use = self.counters["in_use"]
+            self.reset()
+            # Sessions still open carry over into the next interval
+            self.counters["in_use"] = in_use
+            self.counters["peak_in_use"] = in_use
+        try:
+            key = POOL_METRICS_KEY.format(
+                process=f"{socket.gethostname()}:{os.getpid()}")
+            counters["flushed_at"] = self._last_flush
+            counters["pool_size"] = settings.NEO4J_MAX_CONNECTION_POOL_SIZE
+            redis_conn = get_redis_connection("default")
+            pipe = redis_conn.pipeline()
+            pipe.hset(key, mapping=counters)
+            pipe.expire(key, settings.NEO4J_POOL_METRICS_INTERVAL * 6)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f'Error flushing Neo4j pool metrics: {e}')
+
+
+pool_metrics = PoolMetrics()
+
+
+@contextmanager
+def _session(transaction, access_mode):
+    pool_metrics.acquire()
+    started = time.perf_counter()
+    failed = False
+    try:
+        with transaction:
+            yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        pool_metrics.release(
+            access_mode, time.perf_counter() - started, failed)
+
+
+def read_session():
+    """
+    Run the enclosed graph reads in a READ-access transaction.
+
+    With a routing URL (neo4j://) reads go to follower members and stay off
+    the writer that serves the sync path.
+    """
+    return _session(db.read_transaction, "read")
+
+
+def write_session():
+    """
+    Run the enclosed graph writes in a WRITE-access transaction.
+    """
+    return _session(db.write_transaction, "write")
+
+
+def read_query(query, params=None):
+    """
+    Run one read-only Cypher query in its own READ-access transaction.
+    """
+    with read_session():
+        rows, _ = db.cypher_query(query, params)
+    return rows
+
+
+def pool_stats():
+    """
+    Return the latest pool metrics of every live process, keyed by process.
+    """
+    redis_conn = get_redis_connection("default")
+    stats = {}
+    for key in redis_conn.scan_iter(POOL_METRICS_KEY.format(process="*")):
+        process = key.decode().split(":", 2)[2]
+        stats[process] = {field.decode(): float(value) for field, value in
+                          redis_conn.hgetall(key).items()}
+    return stats
+
+
+# stories/neo_db.py
@@ -1,5 +1,6 @@
 import logging
 from django_neomodel import DjangoNode
+from .neo_db import read_query
 from neomodel import (UniqueIdProperty, DateTimeProperty,
                       IntegerProperty, StringProperty,
                       RelationshipTo, RelationshipFrom)
@@ -27,14 +28,26 @@ class Storyline(DjangoNode):
     subject = StringProperty()
     hashtags = StringProperty()
     stories = RelationshipFrom('StoryNode', 'PART_OF')
+    # Cached PART_OF degree, kept up to date by the sync path
+    stories_total = IntegerProperty()
 
     created_at = DateTimeProperty(default_now=True)
     updated_at = DateTimeProperty(default_now=True, on_update=True)
     prefetched_hashtags = None  # Temporary attribute for caching
+    prefetched_stories_count = None
 
     @property
     def stories_count(self):
-        count = len(self.stories.all())
+        if self.prefetched_stories_count is not None:
+            return self.prefetched_stories_count
+        if self.stories_total is not None:
+            return self.stories_total
+        rows = read_query(
+            "MATCH (storyline:Storyline {id: $id}) "
+            "RETURN size([(storyline)<-[:PART_OF]-() | 1])",
+            {"id": self.id},
+        )
+        count = rows[0][0] if rows else 0
         logger.debug(f'Calculating stories count: {count}')
         return count
 
@@ -65,10 +78,19 @@ class Hashtag(DjangoNode):
 
     name = StringProperty(unique_index=True)
     stories = RelationshipFrom('StoryNode', 'HAS_HASHTAG')
+    # Cached HAS_HASHTAG degree, kept up to date by the sync path
+    stories_total = IntegerProperty()
 
     @property
     def stories_count(self):
-        count = len(self.stories.all())
+        if self.stories_total is not None:
+            return self.stories_total
+        rows = read_query(
+            "MATCH (hashtag:Hashtag {name: $name}) "
+            "RETURN size([(hashtag)<-[:HAS_HASHTAG]-() | 1])",
+            {"name": self.name},
+        )
+        count = rows[0][0] if rows else 0
         logger.debug(
             f'Calculating stories count for hashtag {self.name}: {count}')
         return count
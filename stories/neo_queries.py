@@ -0,0 +1,261 @@
+import logging
+from django.conf import settings
+from neomodel import db
+from utils.pagination import LazySequence
+from .neo_db import read_query
+from .neo_models import Storyline
+from .utils import hydrate_stories
+
+# Set up the logger for this module
+logger = logging.getLogger('app_logger')
+
+
+STORYLINE_COUNT_QUERY = """
+MATCH (storyline:Storyline)
+RETURN count(storyline)
+"""
+
+# Ordering needs only the hashtag count, so names are collected for the
+# requested page alone, after SKIP/LIMIT.
+STORYLINE_PAGE_QUERY = """
+MATCH (storyline:Storyline)
+CALL {
+    WITH storyline
+    OPTIONAL MATCH (storyline)<-[:PART_OF]-(:StoryNode)-[:HAS_HASHTAG]->(hashtag:Hashtag)
+    RETURN count(DISTINCT hashtag) AS hashtag_count
+}
+WITH storyline, hashtag_count
+ORDER BY storyline.updated_at DESC, hashtag_count DESC, storyline.id
+SKIP $skip LIMIT $limit
+WITH storyline,
+     coalesce(storyline.stories_total,
+              size([(storyline)<-[:PART_OF]-() | 1])) AS stories_count
+CALL {
+    WITH storyline
+    OPTIONAL MATCH (storyline)<-[:PART_OF]-(:StoryNode)-[:HAS_HASHTAG]->(hashtag:Hashtag)
+    RETURN collect(DISTINCT hashtag.name) AS hashtag_names
+}
+RETURN storyline, hashtag_names, stories_count
+"""
+
+
+def count_storylines():
+    rows = read_query(STORYLINE_COUNT_QUERY)
+    return rows[0][0] if rows else 0
+
+
+def fetch_storylines(start, stop):
+    """
+    Return one page of storylines, newest first, ready to serialize.
+
+    Each storyline comes with `prefetched_hashtags` (hashtag names) and
+    `prefetched_stories_count` set, so serializing it costs no further
+    round trips.
+    """
+    if stop <= start:
+        return []
+    logger.debug(f'Fetching storylines {start} to {stop}')
+    rows = read_query(
+        STORYLINE_PAGE_QUERY, {"skip": start, "limit": stop - start})
+
+    storylines = []
+    for node, hashtag_names, stories_count in rows:
+        storyline = Storyline.inflate(node)
+        storyline.prefetched_hashtags = sorted(hashtag_names)
+        storyline.prefetched_stories_count = stories_count
+        storylines.append(storyline)
+    return storylines
+
+
+def storyline_sequence():
+    """
+    Return every storyline as a paginator-compatible sequence.
+    """
+    return LazySequence(count_storylines, fetch_storylines)
+
+
+HASHTAG_COUNT_QUERY = """
+MATCH (hashtag:Hashtag)
+RETURN count(hashtag)
+"""
+
+# Degrees are counted with size() over a pattern comprehension rather than
+# COUNT {}, which needs Neo4j 5.3+; the k8s chart still runs 4.4. Without a
+# label on the far end the count only touches the node's relationships.
+HASHTAG_PAGE_QUERY = """
+MATCH (hashtag:Hashtag)
+WITH hashtag,
+     coalesce(hashtag.stories_total,
+              size([(hashtag)<-[:HAS_HASHTAG]-() | 1])) AS stories_count
+ORDER BY stories_count DESC, hashtag.name
+SKIP $skip LIMIT $limit
+RETURN hashtag.name, stories_count
+"""
+
+REFRESH_HASHTAG_DEGREES_QUERY = """
+MATCH (hashtag:Hashtag)
+WHERE $names IS NULL OR hashtag.name IN $names
+SET hashtag.stories_total = size([(hashtag)<-[:HAS_HASHTAG]-() | 1])
+RETURN count(hashtag)
+"""
+
+REFRESH_STORYLINE_DEGREES_QUERY = """
+MATCH (storyline:Storyline)
+WHERE $ids IS NULL OR storyline.id IN $ids
+SET storyline.stories_total = size([(storyline)<-[:PART_OF]-() | 1])
+RETURN count(storyline)
+"""
+
+
+def count_hashtags():
+    rows = read_query(HASHTAG_COUNT_QUERY)
+    return rows[0][0] if rows else 0
+
+
+def fetch_hashtags(start, stop):
+    """
+    Return one page of hashtags ranked by number of stories.
+    """
+    if stop <= start:
+        return []
+    logger.debug(f'Fetching hashtags {start} to {stop}')
+    rows = read_query(
+        HASHTAG_PAGE_QUERY, {"skip": start, "limit": stop - start})
+    return [{"name": name, "stories_count": stories_count}
+            for name, stories_count in rows]
+
+
+def hashtag_sequence():
+    """
+    Return every hashtag, most used first, as a paginator-compatible sequence.
+    """
+    return LazySequence(count_hashtags, fetch_hashtags)
+
+
+def refresh_degree_counts(hashtag_names=None, storyline_ids=None):
+    """
+    Recompute the cached `stories_total` of the given hashtags and storylines.
+
+    Pass None to refresh every node of that label, or an empty list to skip
+    it. Each refresh is a degree lookup, so it does not depend on how many
+    stories a node has.
+    """
+    if hashtag_names is None or hashtag_names:
+        rows, _ = db.cypher_query(
+            REFRESH_HASHTAG_DEGREES_QUERY,
+            {"names": list(hashtag_names) if hashtag_names else None})
+        logger.debug(f'Refreshed degree counts of {rows[0][0]} hashtags')
+    if storyline_ids is None or storyline_ids:
+        rows, _ = db.cypher_query(
+            REFRESH_STORYLINE_DEGREES_QUERY,
+            {"ids": list(storyline_ids) if storyline_ids else None})
+        logger.debug(f'Refreshed degree counts of {rows[0][0]} storylines')
+
+
+STORYLINE_STORIES_COUNT_QUERY = """
+MATCH (storyline:Storyline {id: $storyline_id})
+RETURN coalesce(storyline.stories_total,
+                size([(storyline)<-[:PART_OF]-() | 1]))
+"""
+
+STORYLINE_STORIES_PAGE_QUERY = """
+MATCH (:Storyline {id: $storyline_id})<-[:PART_OF]-(story:StoryNode)
+RETURN story.story_id
+ORDER BY story.event_occurred_at, story.story_id
+SKIP $skip LIMIT $limit
+"""
+
+
+def storyline_story_sequence(storyline_id, queryset=None):
+    """
+    Return a storyline's stories in event order as a paginator-compatible
+    sequence.
+
+    Only the requested page of IDs is read from Neo4j, and those stories
+    are hydrated from Postgres in graph order.
+    """
+    def count():
+        rows = read_query(
+            STORYLINE_STORIES_COUNT_QUERY, {"storyline_id": storyline_id})
+        return rows[0][0] if rows else 0
+
+    def fetch(start, stop):
+        if stop <= start:
+            return []
+        rows = read_query(STORYLINE_STORIES_PAGE_QUERY, {
+            "storyline_id": storyline_id,
+            "skip": start,
+            "limit": stop - start,
+        })
+        return hydrate_stories([story_id for story_id, in rows], queryset)
+
+    return LazySequence(count, fetch)
+
+
+# Descendants of the anchor (the anchor included) in chronological order, or
+# its ancestors newest first. Path bounds cannot be parameters, so the depth
+# is formatted in from settings.
+TIMELINE_QUERY = """
+MATCH (anchor:StoryNode {{story_id: $story_id}})
+MATCH {path}
+WITH DISTINCT story, coalesce(story.event_occurred_at, 0.0) AS occurred_at
+WHERE $position IS NULL
+   OR occurred_at {op} $position[0]
+   OR (occurred_at = $position[0] AND story.story_id {op} $position[1])
+RETURN story.story_id, occurred_at
+ORDER BY occurred_at {order}, story.story_id {order}
+LIMIT $limit
+"""
+
+TIMELINE_PATHS = {
+    "forward": "(anchor)-[:FOLLOWS*0..{depth}]->(story:StoryNode)",
+    "backward": "(story:StoryNode)-[:FOLLOWS*1..{depth}]->(anchor)",
+}
+
+
+class StoryTimeline:
+    """
+    The stories reachable from an anchor story over FOLLOWS edges.
+
+    "forward" walks to later stories, oldest first; "backward" walks to
+    earlier ones, newest first. Pages are fetched by keyset on
+    `(event_occurred_at, story_id)`, so scrolling a long storyline never
+    loads it whole.
+    """
+
+    def __init__(self, story_id, direction, queryset=None):
+        self.story_id = story_id
+        self.direction = direction
+        self.queryset = queryset
+
+    def fetch(self, position=None, reverse=False, limit=10):
+        """
+        Return the keyset positions of up to `limit` stories past `position`.
+
+        Positions are `(event_occurred_at, story_id)` pairs in timeline
+        order. With `reverse` the timeline is walked against its order, i.e.
+        the stories before `position`, nearest first.
+        """
+        ascending = (self.direction == "forward") != reverse
+        query = TIMELINE_QUERY.format(
+            path=TIMELINE_PATHS[self.direction].format(
+                depth=settings.STORYLINE_TIMELINE_MAX_DEPTH),
+            op=">" if ascending else "<",
+            order="ASC" if ascending else "DESC",
+        )
+        rows = read_query(query, {
+            "story_id": self.story_id,
+            "position": list(position) if position else None,
+            "limit": limit,
+        })
+        return [(occurred_at, story_id) for story_id, occurred_at in rows]
+
+    def hydrate(self, positions):
+        """
+        Load the stories of `positions` from Postgres, keeping their order.
+        """
+        return hydrate_stories(
+            [story_id for _, story_id in positions], self.queryset)
+
+
+# stories/neo_queries.py
@@ -30,6 +30,9 @@ class StorylineSerializer(serializers.Serializer):
 
     def get_hashtags(self, obj):
         logger.debug(f'Getting hashtags for storyline {obj.id}')
+        if obj.prefetched_hashtags is not None:
+            # Hashtag names aggregated by the listing query
+            return obj.prefetched_hashtags
         # Assuming the get_hashtags method in the Storyline model returns a list of Hashtag objects
         try:
             hashtags = obj.get_hashtags()
@@ -1,15 +1,34 @@
 import logging
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.conf import settings
 from .models import Story
-from .neo_models import StoryNode, Hashtag
-from .utils import extract_hashtags
+from .neo_sync import DELETE, UPSERT, enqueue_change, story_change
+from .tasks import sync_story_graph
 
 # Set up the logger for this module
 logger = logging.getLogger('app_logger')
 
 
+def queue_story_change(record):
+    """
+    Queue a change record for the graph sync worker once the write commits.
+
+    The request never waits on Neo4j; the worker applies queued records in
+    batches.
+    """
+    def enqueue():
+        try:
+            enqueue_change(record)
+            sync_story_graph.delay()
+        except Exception as e:
+            logger.error(
+                f'Error queueing graph sync for Story id {record["story_id"]}: {e}')
+
+    transaction.on_commit(enqueue)
+
+
 @receiver(post_save, sender=Story)
 def create_or_update_story_node(sender, instance, created, **kwargs):
     if settings.SEEDING:
@@ -17,61 +36,13 @@ def create_or_update_story_node(sender, instance, created, **kwargs):
         return
 
     logger.debug(f'Processing post_save signal for Story id {instance.id}')
-    hashtags = extract_hashtags(instance.body)
-
-    if created:
-        logger.info(f'Creating StoryNode for Story id {instance.id}')
-        story_node = StoryNode(
-            story_id=instance.id, event_occurred_at=instance.event_occurred_at
-        )
-        story_node.save()
-
-        for hashtag in hashtags:
-            tag_node, _ = Hashtag.get_or_create({"name": hashtag})
-            if created:
-                logger.debug(f'Created new Hashtag node for {hashtag}')
-            story_node.hashtags.connect(tag_node)
-            logger.debug(
-                f'Connected Hashtag {hashtag} to StoryNode {instance.id}')
-    else:
-        logger.info(f'Updating StoryNode for Story id {instance.id}')
-        story_node = StoryNode.nodes.get(story_id=instance.id)
-        story_node.event_occurred_at = instance.event_occurred_at
-        story_node.save()
-
-        # TODO: Uncomment fast Update hashtags  as this works well before the
-        # addition of loggers
-        # current_hashtags = set(tag.name for tag in story_node.hashtags.all())
-        # for hashtag in hashtags - current_hashtags:
-        #     tag_node, _ = Hashtag.get_or_create({"name": hashtag})
-        #     story_node.hashtags.connect(tag_node)
-        # for hashtag in current_hashtags - hashtags:
-        #     tag_node = Hashtag.nodes.get(name=hashtag)
-        #     story_node.hashtags.disconnect(tag_node)
-
-        # Update hashtags
-        current_hashtags = set(tag.name for tag in story_node.hashtags.all())
-        new_hashtags = set(hashtags)
-        for hashtag in new_hashtags - current_hashtags:
-            tag_node, created = Hashtag.get_or_create({"name": hashtag})
-            if created:
-                logger.debug(f'Created new Hashtag node for {hashtag}')
-            story_node.hashtags.connect(tag_node)
-            logger.debug(
-                f'Connected new Hashtag {hashtag} to StoryNode {instance.id}')
-        for hashtag in current_hashtags - new_hashtags:
-            tag_node = Hashtag.nodes.get(name=hashtag)
-            story_node.hashtags.disconnect(tag_node)
-            logger.debug(
-                f'Disconnected Hashtag {hashtag} from StoryNode {instance.id}')
+    queue_story_change(story_change(instance, UPSERT))
 
 
 @receiver(post_delete, sender=Story)
 def delete_story_node(sender, instance, **kwargs):
-    logger.info(f'Deleting StoryNode for Story id {instance.id}')
-    story_node = StoryNode.nodes.get(story_id=instance.id)
-    story_node.delete()
-    logger.debug(f'Deleted StoryNode for Story id {instance.id}')
+    logger.info(f'Queueing StoryNode deletion for Story id {instance.id}')
+    queue_story_change(story_change(instance, DELETE))
 
 
 # stories/neo_signals.py
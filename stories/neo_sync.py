@@ -0,0 +1,260 @@
+import json
+import logging
+import time
+from collections import namedtuple
+from django.conf import settings
+from django_redis import get_redis_connection
+from neomodel import db
+from utils.cache import bump_version
+from .neo_db import write_session
+from .hashtag_trends import record_hashtag_changes
+from .loaders import cache_storylines, forget_storylines
+from .neo_queries import refresh_degree_counts
+
+# Set up the logger for this module
+logger = logging.getLogger('app_logger')
+
+# Redis keys
+QUEUE_KEY = "neo_sync:queue"
+LOCK_KEY = "neo_sync:lock"
+METRICS_KEY = "neo_sync:metrics"
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+BatchResult = namedtuple(
+    "BatchResult",
+    ["added", "removed", "storyline_ids", "storyline_map", "deleted",
+     "synced_at"])
+
+# Every row carries the story's full graph state, so replaying a batch after
+# a failure converges to the same graph. Nodes go first, so the edges of the
+# second query find every parent of the batch whatever the row order.
+UPSERT_STORIES_QUERY = """
+UNWIND $rows AS row
+MERGE (story:StoryNode {story_id: row.story_id})
+ON CREATE SET story.node_id = replace(randomUUID(), '-', '')
+SET story.event_occurred_at = row.event_occurred_at
+WITH story, row
+OPTIONAL MATCH (story)-[edge:HAS_HASHTAG]->(old:Hashtag)
+WITH story, row, collect(
+    CASE WHEN old IS NULL THEN null ELSE [old.name, edge.added_at] END
+) AS old_hashtags
+CALL {
+    WITH story, row
+    MATCH (story)-[stale:HAS_HASHTAG]->(hashtag:Hashtag)
+    WHERE NOT hashtag.name IN row.hashtags
+    DELETE stale
+}
+CALL {
+    WITH story, row
+    UNWIND row.hashtags AS name
+    MERGE (hashtag:Hashtag {name: name})
+    MERGE (story)-[edge:HAS_HASHTAG]->(hashtag)
+    ON CREATE SET edge.added_at = $now
+}
+RETURN row.story_id, old_hashtags
+"""
+
+UPSERT_EDGES_QUERY = """
+UNWIND $rows AS row
+MATCH (story:StoryNode {story_id: row.story_id})
+CALL {
+    WITH story, row
+    MATCH (other:StoryNode)-[stale:FOLLOWS]->(story)
+    WHERE row.parent_story_id IS NULL OR other.story_id <> row.parent_story_id
+    DELETE stale
+}
+CALL {
+    WITH story, row
+    MATCH (parent:StoryNode {story_id: row.parent_story_id})
+    MERGE (parent)-[:FOLLOWS]->(story)
+    WITH parent, story
+    MATCH (parent)-[:PART_OF]->(storyline:Storyline)
+    MERGE (story)-[:PART_OF]->(storyline)
+}
+RETURN row.story_id, [(story)-[:PART_OF]->(storyline:Storyline) | storyline.id]
+"""
+
+DELETE_STORIES_QUERY = """
+UNWIND $story_ids AS story_id
+MATCH (story:StoryNode {story_id: story_id})
+WITH story, story_id,
+     [(story)-[edge:HAS_HASHTAG]->(hashtag:Hashtag)
+      | [hashtag.name, edge.added_at]] AS hashtags,
+     [(story)-[:PART_OF]->(storyline:Storyline) | storyline.id] AS storyline_ids
+DETACH DELETE story
+RETURN story_id, hashtags, storyline_ids
+"""
+
+
+def story_change(story, op=UPSERT):
+    """
+    Build the compact change record of a Story for the sync queue.
+    """
+    record = {"op": op, "story_id": story.id, "enqueued_at": time.time()}
+    if op == UPSERT:
+        record.update({
+            "event_occurred_at": (
+                story.event_occurred_at.timestamp()
+                if story.event_occurred_at else None),
+            "parent_story_id": story.parent_story_id,
+            # Extracted and normalized by Story.save
+            "hashtags": list(story.hashtags),
+        })
+    return record
+
+
+def enqueue_change(record):
+    """
+    Append a change record to the sync queue.
+    """
+    get_redis_connection("default").rpush(QUEUE_KEY, json.dumps(record))
+    logger.debug(
+        f'Queued graph {record["op"]} for Story id {record["story_id"]}')
+
+
+def _collapse(records):
+    """
+    Keep the last record per story; records carry full state, not deltas.
+    """
+    latest = {}
+    for record in records:
+        latest.pop(record["story_id"], None)
+        latest[record["story_id"]] = record
+    return list(latest.values())
+
+
+def _parents_first(upserts):
+    """
+    Order upserts so a story comes after its parent when both are in the
+    batch, letting children inherit storylines their parent just joined.
+    """
+    by_id = {record["story_id"]: record for record in upserts}
+    ordered, placed = [], set()
+    for record in upserts:
+        chain = []
+        while record is not None and record["story_id"] not in placed:
+            chain.append(record)
+            placed.add(record["story_id"])
+            record = by_id.get(record["parent_story_id"])
+        ordered.extend(reversed(chain))
+    return ordered
+
+
+def apply_changes(records):
+    """
+    Apply a batch of change records to Neo4j in one transaction.
+
+    Returns a BatchResult: the hashtag diff of the batch (removals as
+    `(name, added_at)` pairs, from the edge's creation time), the storylines
+    whose stories changed, the storylines of every upserted story, the
+    deleted story IDs and the time new edges were stamped with.
+    """
+    upserts = _parents_first(
+        [record for record in records if record["op"] == UPSERT])
+    story_ids = [record["story_id"] for record in records
+                 if record["op"] == DELETE]
+    new_hashtags = {record["story_id"]: set(record["hashtags"])
+                    for record in upserts}
+    added, removed, storyline_ids, storyline_map = [], [], set(), {}
+    now = time.time()
+
+    with write_session():
+        if upserts:
+            rows, _ = db.cypher_query(
+                UPSERT_STORIES_QUERY, {"rows": upserts, "now": now})
+            for story_id, old_hashtags in rows:
+                old_hashtags = dict(old_hashtags)
+                added.extend(new_hashtags[story_id] - old_hashtags.keys())
+                removed.extend(
+                    (name, added_at) for name, added_at in old_hashtags.items()
+                    if name not in new_hashtags[story_id])
+            rows, _ = db.cypher_query(UPSERT_EDGES_QUERY, {"rows": upserts})
+            for story_id, storylines in rows:
+                storyline_ids.update(storylines)
+                storyline_map[story_id] = storylines
+        if story_ids:
+            rows, _ = db.cypher_query(
+                DELETE_STORIES_QUERY, {"story_ids": story_ids})
+            for _, hashtags, storylines in rows:
+                removed.extend(hashtags)
+                storyline_ids.update(storylines)
+    return BatchResult(
+        added, removed, storyline_ids, storyline_map, story_ids, now)
+
+
+def drain_queue(batch_size=None, max_batches=None):
+    """
+    Drain the sync queue batch by batch and return the number of records.
+
+    Records are only trimmed from the queue once their batch is committed,
+    so a failed batch is retried on the next run. A Redis lock keeps one
+    worker draining at a time.
+    """
+    batch_size = batch_size or settings.NEO_SYNC_BATCH_SIZE
+    redis_conn = get_redis_connection("default")
+    lock = redis_conn.lock(LOCK_KEY, timeout=300, blocking_timeout=0)
+    if not lock.acquire():
+        logger.debug('Graph sync already running, skipping')
+        return 0
+
+    processed = 0
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            raw_records = redis_conn.lrange(QUEUE_KEY, 0, batch_size - 1)
+            if not raw_records:
+                break
+            records = [json.loads(raw) for raw in raw_records]
+            started = time.time()
+            result = apply_changes(_collapse(records))
+            redis_conn.ltrim(QUEUE_KEY, len(raw_records), -1)
+            lock.extend(300, replace_ttl=True)
+
+            # Derived data for the touched nodes
+            refresh_degree_counts(
+                set(result.added) | {name for name, _ in result.removed},
+                result.storyline_ids)
+            record_hashtag_changes(
+                result.added, result.removed, result.synced_at)
+            cache_storylines(result.storyline_map)
+            forget_storylines(result.deleted)
+            # Covers stories the save signal could not map to storylines yet
+            for storyline_id in result.storyline_ids:
+                bump_version("storyline", storyline_id)
+
+            finished = time.time()
+            lag = finished - min(record["enqueued_at"] for record in records)
+            redis_conn.hset(METRICS_KEY, mapping={
+                "last_run_at": finished,
+                "last_batch_size": len(records),
+                "last_batch_seconds": finished - started,
+                "last_lag_seconds": lag,
+            })
+            redis_conn.hincrby(METRICS_KEY, "processed_total", len(records))
+            logger.info(
+                f'Synced {len(records)} story changes to Neo4j in '
+                f'{finished - started:.3f}s, lag {lag:.3f}s')
+            processed += len(records)
+            batches += 1
+    finally:
+        lock.release()
+    return processed
+
+
+def sync_status():
+    """
+    Return the queue depth and the metrics of the last sync batch.
+    """
+    redis_conn = get_redis_connection("default")
+    status = {key.decode(): float(value) for key, value in
+              redis_conn.hgetall(METRICS_KEY).items()}
+    status["queue_length"] = redis_conn.llen(QUEUE_KEY)
+    oldest = redis_conn.lindex(QUEUE_KEY, 0)
+    status["oldest_pending_seconds"] = (
+        time.time() - json.loads(oldest)["enqueued_at"] if oldest else 0.0)
+    return status
+
+
+# stories/neo_sync.py
@@ -1,46 +1,71 @@
 import logging
+from datetime import datetime, timezone
 from rest_framework import generics
 from rest_framework.response import Response
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from .models import Story
 from .serializers import StorySerializer
 from .neo_serializers import StorylineSerializer, HashtagSerializer
 from .neo_models import Storyline, Hashtag, StoryNode
+from .neo_queries import (storyline_sequence, hashtag_sequence,
+                          storyline_story_sequence, StoryTimeline)
+from .pagination import TimelineCursorPagination
+from .hashtag_trends import WINDOWS, hashtag_window_sequence
 from utils.pagination import CustomPageNumberPagination
-from neomodel.exceptions import DoesNotExist
+from utils.mixins import AnonymousResponseCacheMixin, ConditionalGetMixin
+from utils.cache import get_versions
+from .neo_db import read_query, read_session
+from .mixins import StoryProjectionMixin, HashtagFilterMixin
 
 # Set up the logger for this module
 logger = logging.getLogger('app_logger')
 
 
+class StorylineStateMixin:
+    """
+    Cheap storyline metadata for conditional GETs: `updated_at` from one
+    Cypher lookup plus the storyline's cache version.
+    """
+
+    def get_resource_state(self):
+        storyline_id = self.kwargs["storyline_id"]
+        rows = read_query(
+            "MATCH (storyline:Storyline {id: $storyline_id}) "
+            "RETURN storyline.updated_at",
+            {"storyline_id": storyline_id},
+        )
+        if not rows:
+            return None
+        updated_at = rows[0][0]
+        if updated_at is not None:
+            updated_at = datetime.fromtimestamp(updated_at, tz=timezone.utc)
+        versions = get_versions([("storyline", storyline_id)])
+        return [updated_at, *versions]
+
+
 class StorylineListView(generics.ListAPIView):
     serializer_class = StorylineSerializer
+    pagination_class = CustomPageNumberPagination
 
     def get_queryset(self):
-        logger.debug('Retrieving all storylines')
-        storylines = Storyline.nodes.all()
-
-        # Prefetch related Hashtag objects from Neo4j for all storylines
-        for storyline in storylines:
-            storyline.prefetched_hashtags = storyline.get_hashtags()
-        # Sort by updated_at and then by the number of hashtags
-        sorted_storylines = sorted(
-            storylines,
-            key=lambda x: (x.updated_at, len(x.prefetched_hashtags)),
-            reverse=True
-        )
+        logger.debug('Retrieving storylines')
+        # Hashtags are aggregated and sorted (updated_at, then number of
+        # hashtags) in Cypher, one page at a time
+        return storyline_sequence()
 
-        logger.info('Storylines retrieved and sorted')
-        return sorted_storylines
 
+class StorylineDetailView(ConditionalGetMixin, StorylineStateMixin,
+                          AnonymousResponseCacheMixin, generics.RetrieveAPIView):
+    def get_cache_versions(self):
+        return [("storyline", self.kwargs["storyline_id"])]
 
-class StorylineDetailView(generics.RetrieveAPIView):
-    def get(self, request, *args, **kwargs):
+    def retrieve(self, request, *args, **kwargs):
         storyline_id = self.kwargs["storyline_id"]
         logger.debug(f'Retrieving storyline with id {storyline_id}')
 
         try:
-            storyline = Storyline.nodes.get(id=storyline_id)
+            with read_session():
+                storyline = Storyline.nodes.get(id=storyline_id)
             logger.info(f'Storyline {storyline_id} found')
         except Storyline.DoesNotExist:
             logger.error(f'Storyline {storyline_id} not found')
@@ -59,32 +84,54 @@ class StorylineDetailView(generics.RetrieveAPIView):
         return Response(response_data)
 
 
-class StorylineStoriesView(generics.ListAPIView):
+class StorylineStoriesView(ConditionalGetMixin, StorylineStateMixin,
+                           AnonymousResponseCacheMixin, generics.ListAPIView):
     pagination_class = CustomPageNumberPagination
     serializer_class = StorySerializer
 
+    def get_cache_versions(self):
+        return [("storyline", self.kwargs["storyline_id"])]
+
     def get_queryset(self):
         storyline_id = self.kwargs["storyline_id"]
         logger.debug(f'Retrieving stories for storyline {storyline_id}')
 
-        # Fetch related stories in order
-        try:
-            stories_in_order = list(
-                Storyline.nodes.get(id=storyline_id).stories.order_by(
-                    "event_occurred_at")
-            )
-            story_ids = [story.story_id for story in stories_in_order]
-            logger.info(f'Stories retrieved for storyline {storyline_id}')
-        except Storyline.DoesNotExist:
-            logger.error(f'Storyline {storyline_id} does not exist')
-            return Story.objects.none()
-
-        # Fetch actual story data from PostgreSQL with optimization
-        return (
-            Story.objects.filter(id__in=story_ids)
-            .select_related("user")
-            .prefetch_related("multimedia")
-            .order_by("event_occurred_at")
+        # Ordered and paged in Cypher; Postgres only hydrates the page
+        return storyline_story_sequence(
+            storyline_id,
+            Story.objects.select_related("user").prefetch_related("multimedia"),
+        )
+
+
+class StoryTimelineView(generics.ListAPIView):
+    """
+    Walk the FOLLOWS chain from an anchor story.
+
+    `?direction=forward` (default) lists the anchor and the stories that
+    follow it, oldest first; `?direction=backward` lists the stories that
+    lead up to it, newest first.
+    """
+    serializer_class = StorySerializer
+    pagination_class = TimelineCursorPagination
+    directions = ("forward", "backward")
+
+    def get_queryset(self):
+        story_id = self.kwargs["story_id"]
+        direction = self.request.query_params.get("direction", "forward")
+        if direction not in self.directions:
+            raise ValidationError(
+                {"direction": f"Must be one of: {', '.join(self.directions)}."})
+        if not Story.active_unflagged_objects.active_and_unflagged().filter(
+                id=story_id).exists():
+            raise NotFound(detail="Story not found.")
+
+        logger.debug(f'Retrieving {direction} timeline of story {story_id}')
+        return StoryTimeline(
+            story_id,
+            direction,
+            Story.active_unflagged_objects.active_and_unflagged()
+            .select_related("user", "category")
+            .prefetch_related("multimedia"),
         )
 
 
@@ -100,8 +147,9 @@ class StorylinesForStoryView(generics.ListAPIView):
 
         try:
             story = Story.objects.get(slug=slug)
-            story_node = StoryNode.nodes.get(story_id=story.id)
-            storylines = list(story_node.belongs_to_storyline.all())
+            with read_session():
+                story_node = StoryNode.nodes.get(story_id=story.id)
+                storylines = list(story_node.belongs_to_storyline.all())
             logger.info(f'Storylines retrieved for story {slug}')
         except (Story.DoesNotExist, StoryNode.DoesNotExist):
             logger.error(f'Story or StoryNode with slug {slug} does not exist')
@@ -117,21 +165,17 @@ class TrendingHashtagsListView(generics.ListAPIView):
     pagination_class = CustomPageNumberPagination
 
     def get_queryset(self):
-        logger.debug('Retrieving trending hashtags')
-        # Retrieve all hashtags and annotate them with their stories count
-        hashtags = Hashtag.nodes.all()
-        annotated_hashtags = [
-            {"name": hashtag.name, "stories_count": len(hashtag.stories.all())}
-            for hashtag in hashtags
-        ]
-
-        # Sort the hashtags by stories count in descending order
-        sorted_hashtags = sorted(
-            annotated_hashtags, key=lambda x: x["stories_count"], reverse=True
-        )
+        window = self.request.query_params.get("window")
+        if window:
+            if window not in WINDOWS:
+                raise ValidationError(
+                    {"window": f"Must be one of: {', '.join(WINDOWS)}."})
+            logger.debug(f'Retrieving hashtags trending in the last {window}')
+            return hashtag_window_sequence(window)
 
-        logger.info('Trending hashtags retrieved and sorted')
-        return sorted_hashtags
+        logger.debug('Retrieving trending hashtags')
+        # Hashtags are ranked by stories count in Cypher, one page at a time
+        return hashtag_sequence()
 
 
 class SpecificStorylineHashtagsView(generics.ListAPIView):
@@ -142,10 +186,11 @@ class SpecificStorylineHashtagsView(generics.ListAPIView):
         logger.debug(f'Retrieving hashtags for storyline {storyline_id}')
 
         try:
-            # Get the storyline
-            storyline = Storyline.nodes.get(id=storyline_id)
-            # Get all hashtags associated with this storyline
-            hashtags = storyline.get_hashtags()
+            with read_session():
+                # Get the storyline
+                storyline = Storyline.nodes.get(id=storyline_id)
+                # Get all hashtags associated with this storyline
+                hashtags = storyline.get_hashtags()
             logger.info(f'Hashtags retrieved for storyline {storyline_id}')
         except Storyline.DoesNotExist:
             logger.error(f'Storyline {storyline_id} does not exist')
@@ -154,8 +199,8 @@ class SpecificStorylineHashtagsView(generics.ListAPIView):
         return hashtags
 
 
-# TODO: Implement like StorylinesForStoryView with metadata.
-class StoriesByHashtagsView(generics.ListAPIView):
+class StoriesByHashtagsView(HashtagFilterMixin, StoryProjectionMixin,
+                           generics.ListAPIView):
     serializer_class = StorySerializer
     pagination_class = CustomPageNumberPagination
 
@@ -163,20 +208,14 @@ class StoriesByHashtagsView(generics.ListAPIView):
         hashtag_name = self.kwargs.get("hashtag_name")
         logger.debug(f'Retrieving stories for hashtag {hashtag_name}')
 
+        stories = Story.objects.order_by("-created_at", "-id")
         if hashtag_name:
-            try:
-                hashtag = Hashtag.nodes.get(name=hashtag_name)
-                story_ids = [story.story_id for story in hashtag.stories.all()]
-                logger.info(f'Stories retrieved for hashtag {hashtag_name}')
-                return Story.objects.filter(id__in=story_ids)
-            except DoesNotExist:
-                logger.error(f'Hashtag {hashtag_name} does not exist')
-                # Return an empty queryset if the hashtag doesn't exist
-                return Story.objects.none()
-        else:
-            logger.debug('No hashtag specified, retrieving all stories')
-            # If no hashtag is specified, return all stories (or you can modify this behavior)
-            return Story.objects.all()
+            # One indexed Postgres query on the normalized hashtags column
+            return stories.filter(
+                hashtags__contains=[hashtag_name.lstrip("#").lower()])
+        logger.debug('No hashtag specified, retrieving all stories')
+        # If no hashtag is specified, return all stories (or you can modify this behavior)
+        return stories
 
 
 # stories/neo_views.py
@@ -1,8 +1,10 @@
 # from core.settings import ANCESTORS_PER_PAGE, DESCENDANTS_PER_PAGE
 import logging
 from django.core.paginator import Paginator, EmptyPage
-from rest_framework.pagination import PageNumberPagination
+from django.db.models import Count, Q
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from utils.pagination import KeysetPaginationBase
 
 # Set up the logger for this module
 logger = logging.getLogger('app_logger')
@@ -30,17 +32,23 @@ class CenteredPageNumberPagination(PageNumberPagination):
             logger.debug(f'Requested page number: {page_number}')
         elif last_viewed_story_id:
             try:
-                # Find the index of the last viewed story in the queryset
-                story_ids = list(queryset.order_by(
-                    "id").values_list("id", flat=True))
-                story_index = story_ids.index(int(last_viewed_story_id))
+                # Position of the last viewed story, counted in the database
+                anchor_id = int(last_viewed_story_id)
+                position = queryset.aggregate(
+                    before=Count("id", filter=Q(id__lt=anchor_id)),
+                    found=Count("id", filter=Q(id=anchor_id)),
+                )
+                if not position["found"]:
+                    raise ValueError(
+                        f'Story {anchor_id} is not in the queryset')
+                story_index = position["before"]
 
                 # Calculate the page number to center the last viewed story
                 half_page = page_size // 2
                 page_number = max(
                     1, (story_index - half_page) // page_size + 1)
                 logger.debug(f'Calculated centered page number: {page_number}')
-            except (ValueError, IndexError):
+            except (ValueError, IndexError) as e:
                 logger.warning(f'Error calculating page number: {e}')
                 page_number = 1
         else:
@@ -77,4 +85,95 @@ class CenteredPageNumberPagination(PageNumberPagination):
         return response
 
 
+class AnchoredWindowPagination(BasePagination):
+    """
+    Keyset window of the stories immediately around an anchor story.
+
+    Returns up to `window` stories before and after `around` in the story
+    list's `(-created_at, -id)` order, using two range scans on the
+    composite index, without counting rows or computing a page number.
+    """
+    anchor_query_param = "around"
+    window_query_param = "window"
+    default_window = 5
+    max_window = 100
+
+    def get_window(self, request):
+        try:
+            window = int(request.query_params.get(
+                self.window_query_param, self.default_window))
+        except ValueError:
+            window = self.default_window
+        return max(1, min(window, self.max_window))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.window = self.get_window(request)
+        self.has_before = self.has_after = False
+        try:
+            self.anchor_id = int(request.query_params[self.anchor_query_param])
+        except (KeyError, ValueError):
+            logger.warning('Missing or invalid anchor story id')
+            self.anchor_id = None
+            return []
+
+        anchor_created_at = (
+            queryset.filter(id=self.anchor_id)
+            .values_list("created_at", flat=True)
+            .first()
+        )
+        if anchor_created_at is None:
+            logger.warning(f'Anchor story {self.anchor_id} is not in the list')
+            return []
+
+        logger.debug(
+            f'Loading window of {self.window} around story {self.anchor_id}')
+        before = list(queryset.filter(
+            Q(created_at__gt=anchor_created_at)
+            | Q(created_at=anchor_created_at, id__gt=self.anchor_id)
+        ).order_by("created_at", "id")[:self.window + 1])
+        after = list(queryset.filter(
+            Q(created_at__lt=anchor_created_at)
+            | Q(created_at=anchor_created_at, id__lte=self.anchor_id)
+        ).order_by("-created_at", "-id")[:self.window + 2])
+
+        self.has_before = len(before) > self.window
+        self.has_after = len(after) > self.window + 1
+        return before[:self.window][::-1] + after[:self.window + 1]
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "anchor": self.anchor_id,
+                "window": self.window,
+                "has_before": self.has_before,
+                "has_after": self.has_after,
+                "results": data,
+            }
+        )
+
+
+class TimelineCursorPagination(KeysetPaginationBase):
+    """
+    Keyset pagination over a `StoryTimeline`.
+
+    Cursors carry the `(event_occurred_at, story_id)` position of the page
+    edge, so each page is one bounded Cypher query plus one Postgres query.
+    """
+
+    def cursor_data(self, position):
+        return {"t": position[0], "i": position[1]}
+
+    def cursor_position(self, data):
+        return float(data["t"]), int(data["i"])
+
+    def fetch_rows(self, timeline, position, reverse, limit):
+        return timeline.fetch(position, reverse, limit)
+
+    def build_results(self, timeline, positions):
+        # Stories missing from Postgres (e.g. soft-deleted) are skipped, but
+        # the cursors still move past them
+        return timeline.hydrate(positions)
+
+
 # stories/pagination.py
@@ -2,12 +2,12 @@ from .models import UserSearchHistory
 import logging
 from rest_framework import serializers
 from .models import Story, Category, Like, Dislike, Bookmark
-from .neo_models import StoryNode
-from utils.serializers import UnixTimestampModelSerializer
+from utils.serializers import UnixTimestampModelSerializer, SparseFieldsetMixin
 from multimedia.serializers import MultimediaSerializer
 from common.serializers import CustomUserSerializer
 from django_elasticsearch_dsl_drf.serializers import DocumentSerializer
 from .documents import StoryDocument
+from .loaders import get_viewer_flags, attach_storylines
 
 # Set up the logger for this module
 logger = logging.getLogger('app_logger')
@@ -31,7 +31,24 @@ class CategorySerializer(UnixTimestampModelSerializer):
         return value
 
 
-class StorySerializer(UnixTimestampModelSerializer):
+class StoryListSerializer(serializers.ListSerializer):
+    """
+    List serializer that batch-loads per-viewer data for a whole page of stories.
+    """
+
+    def to_representation(self, data):
+        stories = list(data.all() if hasattr(data, "all") else data)
+        fields = self.child.fields
+        # Only batch-load what the (possibly sparse) child will actually read
+        if fields.keys() & StorySerializer.VIEWER_FLAG_FIELDS:
+            get_viewer_flags(self.context).load(
+                [story.id for story in stories])
+        if fields.keys() & StorySerializer.STORYLINE_FIELDS:
+            attach_storylines(stories)
+        return super().to_representation(stories)
+
+
+class StorySerializer(SparseFieldsetMixin, UnixTimestampModelSerializer):
     """Serializer for the Story model."""
 
     has_liked = serializers.SerializerMethodField()
@@ -43,6 +60,9 @@ class StorySerializer(UnixTimestampModelSerializer):
     storyline_id = serializers.SerializerMethodField()
     category = CategorySerializer(read_only=True)
 
+    VIEWER_FLAG_FIELDS = {"has_liked", "has_disliked", "has_bookmarked"}
+    STORYLINE_FIELDS = {"storylines_count", "storyline_id"}
+
     class Meta:
         model = Story
         # fields = '__all__'
@@ -56,57 +76,44 @@ class StorySerializer(UnixTimestampModelSerializer):
             "multimedia",
             "likes_count",
             "dislikes_count",
-        ] + [f.name for f in Story._meta.fields]
+        ] + [f.name for f in Story._meta.fields if f.name not in Story.COUNTER_FIELDS]
         # if there are fields from the model that we don't want to show in the view here it is 'slug', 'body', 'deleted_at'.
         # fields = ['storylines_count', 'multimedia'] + [f.name for f in Story._meta.fields if f.name not in ['slug', 'body', 'deleted_at']]
+        list_serializer_class = StoryListSerializer
+        # Nested or query-backed fields that `?expand=` can add to `?fields=`
+        expandable_fields = [
+            "storylines_count",
+            "storyline_id",
+            "has_liked",
+            "has_disliked",
+            "has_bookmarked",
+            "user",
+            "multimedia",
+            "category",
+        ]
 
     def get_has_liked(self, obj):
-        user = self.context["request"].user
-        if user.is_authenticated:
-            logger.debug(f'Checking if user {user.id} liked story {obj.id}')
-            return Like.objects.filter(story=obj, user=user).exists()
-        return None
+        logger.debug(f'Checking if viewer liked story {obj.id}')
+        return get_viewer_flags(self.context).has_liked(obj.id)
 
     def get_has_disliked(self, obj):
-        user = self.context["request"].user
-        if user.is_authenticated:
-            logger.debug(f'Checking if user {user.id} disliked story {obj.id}')
-            return Dislike.objects.filter(story=obj, user=user).exists()
-        return None
+        logger.debug(f'Checking if viewer disliked story {obj.id}')
+        return get_viewer_flags(self.context).has_disliked(obj.id)
 
     def get_has_bookmarked(self, obj):
-        user = self.context["request"].user
-        if user.is_authenticated:
-            logger.debug(
-                f'Checking if user {user.id} bookmarked story {obj.id}')
-            return Bookmark.objects.filter(story=obj, user=user).exists()
-        return None
+        logger.debug(f'Checking if viewer bookmarked story {obj.id}')
+        return get_viewer_flags(self.context).has_bookmarked(obj.id)
 
     def get_storylines_count(self, obj):
-        try:
-            logger.debug(f'Getting storylines count for story {obj.id}')
-            # Get the StoryNode from Neo4j
-            story_node = StoryNode.nodes.get(story_id=obj.id)
-
-            # Get all Storyline nodes this story belongs to
-            storylines = list(story_node.belongs_to_storyline.all())
-            return len(storylines)
-        except Exception as e:
-            logger.error(
-                f'Error getting storylines count for story {obj.id}: {e}')
-            return 0
+        logger.debug(f'Getting storylines count for story {obj.id}')
+        attach_storylines([obj])
+        return len(obj.storyline_ids)
 
     def get_storyline_id(self, obj):
-        try:
-            logger.debug(f'Getting storyline ID for story {obj.id}')
-            story_node = StoryNode.nodes.get(story_id=obj.id)
-            storyline = story_node.belongs_to_storyline.all()[
-                0
-            ]  # Assuming a story belongs to only one storyline
-            return storyline.id
-        except Exception as e:
-            logger.error(f'Error getting storyline ID for story {obj.id}: {e}')
-            return None
+        logger.debug(f'Getting storyline ID for story {obj.id}')
+        attach_storylines([obj])
+        # Assuming a story belongs to only one storyline
+        return obj.storyline_ids[0] if obj.storyline_ids else None
 
 
 class StoryDocumentSerializer(DocumentSerializer):
@@ -195,6 +202,19 @@ class DislikeSerializer(UnixTimestampModelSerializer):
         return data
 
 
+class BookmarkListSerializer(serializers.ListSerializer):
+    """
+    List serializer that batch-loads viewer data for the bookmarked stories.
+    """
+
+    def to_representation(self, data):
+        bookmarks = list(data.all() if hasattr(data, "all") else data)
+        get_viewer_flags(self.context).load(
+            [bookmark.story_id for bookmark in bookmarks])
+        attach_storylines([bookmark.story for bookmark in bookmarks])
+        return super().to_representation(bookmarks)
+
+
 class BookmarkSerializer(UnixTimestampModelSerializer):
     story = StorySerializer(read_only=True)
     story_id = serializers.PrimaryKeyRelatedField(
@@ -214,6 +234,7 @@ class BookmarkSerializer(UnixTimestampModelSerializer):
             "story_id",
             "created_at",
         ]
+        list_serializer_class = BookmarkListSerializer
 
 
 class TrendingStorySerializer(serializers.ModelSerializer):
@@ -1,32 +1,225 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Story
-from .tasks import (index_story_to_elasticsearch,
-                    remove_story_from_elasticsearch)
+from utils.cache import bump_version
+from .models import Story, Like, Dislike, Bookmark, Category
+from .loaders import cached_storylines
+from .counters import adjust_counter
+from . import trending
+from .feeds import invalidate_feed
+from .indexing import queue_index_update
+from .tasks import fan_out_story, retract_story
 import logging
 
 logger = logging.getLogger('app_logger')
 
 
+CATEGORY_SLUG_KEY = "category:slug:{category_id}"
+
+
+def category_slug(category_id):
+    """
+    Slug of a category, cached so write paths do not look it up every time.
+    """
+    return cache.get_or_set(
+        CATEGORY_SLUG_KEY.format(category_id=category_id),
+        lambda: Category.objects.filter(pk=category_id)
+        .values_list("slug", flat=True).first(),
+        None,
+    )
+
+
+def bump_story_versions(story_id, category_ids=(), category_slugs=()):
+    """
+    Invalidate cached responses that include this story.
+
+    Covers the story itself, the category lists it is in and the storyline
+    lists the Redis mapping knows about. Storylines of stories not in the
+    mapping yet are bumped by the graph sync worker.
+    """
+    bump_version("story", story_id)
+    category_slugs = set(category_slugs)
+    category_slugs.update(category_slug(category_id)
+                          for category_id in set(category_ids) - {None})
+    for slug in category_slugs - {None}:
+        bump_version("category", slug)
+    try:
+        storyline_ids = cached_storylines([story_id]).get(story_id, [])
+    except Exception as e:
+        logger.error(f'Error reading storylines of story {story_id}: {e}')
+        storyline_ids = []
+    for storyline_id in storyline_ids:
+        bump_version("storyline", storyline_id)
+
+
+def story_changed(story):
+    """
+    Bump the versions of a saved or deleted story once the write commits.
+    """
+    story_id = story.id
+    category_ids = {story.category_id,
+                    getattr(story, "_loaded_category_id", None)}
+    # The category is usually loaded with the story already
+    category_slugs = []
+    if Story.category.is_cached(story) and story.category is not None:
+        category_slugs.append(story.category.slug)
+        category_ids.discard(story.category_id)
+    story._loaded_category_id = story.category_id
+    transaction.on_commit(lambda: bump_story_versions(
+        story_id, category_ids, category_slugs))
+
+
+def interaction_story(instance):
+    """
+    Return `(category_id, is_live)` of the story an interaction belongs to.
+
+    Uses the story already loaded on the instance when there is one, and a
+    single column lookup otherwise. Soft-deleted and flagged stories are
+    not live.
+    """
+    if type(instance).story.is_cached(instance):
+        story = instance.story
+        return (story.category_id,
+                story.deleted_at is None and not story.is_flagged)
+    row = (
+        Story.objects.filter(pk=instance.story_id)
+        .values_list("category_id", "deleted_at", "is_flagged")
+        .first()
+    )
+    if row is None:
+        return None, False
+    category_id, deleted_at, is_flagged = row
+    return category_id, deleted_at is None and not is_flagged
+
+
+def interaction_changed(instance, weight=None, bump_versions=True):
+    """
+    Bump the versions of the story an interaction belongs to and, for new
+    interactions with a `weight`, fold it into the trending sets.
+
+    Story responses, and the category and storyline lists built from them,
+    carry the like and dislike counts, so all of them are bumped. Views are
+    not part of any response and pass `bump_versions=False`.
+    """
+    story_id = instance.story_id
+    category_id, is_live = interaction_story(instance)
+    if bump_versions:
+        transaction.on_commit(
+            lambda: bump_story_versions(story_id, [category_id]))
+    if weight is not None and is_live:
+        # A rolled-back interaction must not count towards trending
+        transaction.on_commit(
+            lambda: trending.record_event(story_id, weight, category_id))
+
+
+def retract_from_feeds(story):
+    """
+    Queue the removal of a story from the feeds it was fanned out to.
+    """
+    args = (story.id, story.user_id, story.category_id)
+    transaction.on_commit(lambda: retract_story.delay(*args))
+
+
 @receiver(post_save, sender=Story)
-def handle_story_saved(sender, instance, **kwargs):
+def handle_story_saved(sender, instance, created, **kwargs):
     """
     Signal that triggers when a Story is created or updated.
-    It sends a task to index the Story into Elasticsearch.
+    It queues the Story for the next batched Elasticsearch flush and, for
+    new stories, sends a task to fan it out to the materialized user feeds;
+    soft-deleted or flagged stories are pulled back out of them.
     """
     logger.debug(
-        f'Story {instance.id} saved. Sending task to index it into Elasticsearch.')
-    index_story_to_elasticsearch.delay(instance.id)
+        f'Story {instance.id} saved. Queueing it for Elasticsearch indexing.')
+    story_id = instance.id
+    transaction.on_commit(lambda: queue_index_update(story_id))
+    story_changed(instance)
+    if created and not settings.SEEDING:
+        fan_out_story.delay(instance.id)
+    elif instance.deleted_at is not None or instance.is_flagged:
+        retract_from_feeds(instance)
 
 
 @receiver(post_delete, sender=Story)
 def handle_story_deleted(sender, instance, **kwargs):
     """
     Signal that triggers when a Story is deleted.
-    It sends a task to remove the Story from Elasticsearch.
+    It queues the Story so the next flush removes its document.
     """
     logger.debug(
-        f'Story {instance.id} deleted. Sending task to remove it from Elasticsearch.')
-    remove_story_from_elasticsearch.delay(instance.id)
+        f'Story {instance.id} deleted. Queueing it for Elasticsearch removal.')
+    story_id = instance.id
+    transaction.on_commit(lambda: queue_index_update(story_id))
+    story_changed(instance)
+    retract_from_feeds(instance)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def handle_category_changed(sender, instance, **kwargs):
+    # Slugs follow the title
+    cache.delete(CATEGORY_SLUG_KEY.format(category_id=instance.id))
+
+
+@receiver(post_save, sender=Like)
+def handle_like_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(instance.story_id, "like_count", 1)
+        interaction_changed(instance, trending.LIKE_WEIGHT)
+
+
+@receiver(post_delete, sender=Like)
+def handle_like_deleted(sender, instance, **kwargs):
+    adjust_counter(instance.story_id, "like_count", -1)
+    interaction_changed(instance)
+
+
+@receiver(post_save, sender=Dislike)
+def handle_dislike_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(instance.story_id, "dislike_count", 1)
+        interaction_changed(instance, trending.DISLIKE_WEIGHT)
+
+
+@receiver(post_delete, sender=Dislike)
+def handle_dislike_deleted(sender, instance, **kwargs):
+    adjust_counter(instance.story_id, "dislike_count", -1)
+    interaction_changed(instance)
+
+
+@receiver(post_save, sender=Bookmark)
+@receiver(post_delete, sender=Bookmark)
+def handle_bookmark_changed(sender, instance, **kwargs):
+    # has_bookmarked is part of the story response and its ETag
+    story_id = instance.story_id
+    transaction.on_commit(lambda: bump_version("story", story_id))
+
+
+@receiver(post_save, sender="analytics.StoryInteraction")
+def handle_interaction_saved(sender, instance, created, **kwargs):
+    if created and instance.interaction_type == "view":
+        adjust_counter(instance.story_id, "view_count", 1)
+        # view_count is not serialized, so cached responses stay valid
+        interaction_changed(
+            instance, trending.VIEW_WEIGHT, bump_versions=False)
+
+
+@receiver(post_delete, sender="analytics.StoryInteraction")
+def handle_interaction_deleted(sender, instance, **kwargs):
+    if instance.interaction_type == "view":
+        adjust_counter(instance.story_id, "view_count", -1)
+
+
+@receiver(post_save, sender="users.UserSetting")
+def handle_user_setting_saved(sender, instance, **kwargs):
+    # Favorite categories may have changed, rebuild the feed on next read
+    invalidate_feed(instance.user_id)
+
+
+@receiver(post_save, sender="users.Follow")
+@receiver(post_delete, sender="users.Follow")
+def handle_follow_changed(sender, instance, **kwargs):
+    invalidate_feed(instance.follower_id)
 
 # stories/signals.py
@@ -2,68 +2,25 @@ from django_redis import get_redis_connection
 import logging
 from celery import shared_task
 from .models import Story
-from .documents import StoryDocument
+from .indexing import bulk_index_stories, flush_index_queue
+from .trending import refresh_trending_sets
+from .feeds import push_story, pull_story
+from .hashtag_trends import refresh_hashtag_windows
+from .neo_sync import drain_queue
 
 logger = logging.getLogger('app_logger')
 
 
-@shared_task
-def index_story_to_elasticsearch(story_id):
-    """
-    Task to index a single story into Elasticsearch.
-    """
-    try:
-        # Fetch the story from the database
-        story = Story.objects.get(id=story_id)
-        logger.debug(f'Indexing story with ID {story_id} into Elasticsearch.')
-
-        # Index the story using StoryDocument
-        StoryDocument().update(story)
-
-        logger.info(
-            f'Successfully indexed story with ID {story_id} into Elasticsearch.')
-
-    except Story.DoesNotExist:
-        logger.error(
-            f'Story with ID {story_id} does not exist. Skipping indexing.')
-
-
-@shared_task
-def remove_story_from_elasticsearch(story_id):
-    """
-    Task to remove a story from the Elasticsearch index.
-    """
-    try:
-        # Fetch the story from the database
-        story = Story.objects.get(id=story_id)
-        logger.debug(f'Removing story with ID {story_id} from Elasticsearch.')
-
-        # Remove the story using StoryDocument
-        StoryDocument().delete(story)
-
-        logger.info(
-            f'Successfully removed story with ID {story_id} from Elasticsearch.')
-
-    except Story.DoesNotExist:
-        logger.error(
-            f'Story with ID {story_id} does not exist. Skipping deletion.')
-
-
 @shared_task
 def reindex_all_stories():
     """
     Task to reindex all stories into Elasticsearch.
     """
     logger.debug('Starting full reindex of all stories into Elasticsearch.')
-    # Get all stories from the database
-    stories = Story.objects.all()
-
-    # Loop through and reindex each story
-    for story in stories:
-        logger.debug(f'Indexing story with ID {story.id} into Elasticsearch.')
-        StoryDocument().update(story)
-
-    logger.info('Successfully completed full reindex of all stories.')
+    indexed, failed = bulk_index_stories()
+    logger.info(
+        f'Completed full reindex of all stories: {indexed} indexed, '
+        f'{failed} failed.')
 
 
 @shared_task
@@ -100,4 +57,74 @@ def clean_old_search_queries():
         logger.info("Cleaned up infrequent search queries from Redis.")
     except Exception as e:
         logger.error(f"Error cleaning search queries: {e}")
+
+
+@shared_task
+def flush_search_index():
+    """
+    Task to send the queued story updates to Elasticsearch in one bulk request.
+    """
+    try:
+        flush_index_queue()
+    except Exception as e:
+        logger.error(f"Error flushing story updates to Elasticsearch: {e}")
+        raise
+
+
+@shared_task
+def refresh_trending_stories():
+    """
+    Task to rebuild the time-decayed trending story sets in Redis.
+    """
+    try:
+        refresh_trending_sets()
+    except Exception as e:
+        logger.error(f"Error refreshing trending stories: {e}")
+        raise
+
+
+@shared_task
+def fan_out_story(story_id):
+    """
+    Task to push a newly created story into the materialized user feeds.
+    """
+    try:
+        story = Story.objects.get(id=story_id)
+    except Story.DoesNotExist:
+        logger.error(
+            f'Story with ID {story_id} does not exist. Skipping fan-out.')
+        return
+    push_story(story)
+
+
+@shared_task
+def retract_story(story_id, author_id, category_id):
+    """
+    Task to remove a deleted or flagged story from the materialized user feeds.
+    """
+    pull_story(story_id, author_id, category_id)
+
+
+@shared_task
+def refresh_trending_hashtags():
+    """
+    Task to roll the hashtag buckets up into the 1h/24h/7d trending windows.
+    """
+    try:
+        refresh_hashtag_windows()
+    except Exception as e:
+        logger.error(f"Error refreshing trending hashtags: {e}")
+        raise
+
+
+@shared_task
+def sync_story_graph():
+    """
+    Task to apply the queued story changes to Neo4j in batches.
+    """
+    try:
+        drain_queue()
+    except Exception as e:
+        logger.error(f"Error syncing story changes to Neo4j: {e}")
+        raise
 # stories/tasks.py
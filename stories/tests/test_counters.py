@@ -0,0 +1,56 @@
+import pytest
+from authentication.models import CustomUser
+from stories.counters import adjust_counter, recompute_counters
+from stories.models import Story, Like
+
+
+def create_story(**fields):
+    # bulk_create skips the save signals (search index, graph sync, fan-out)
+    [user] = CustomUser.objects.bulk_create([CustomUser(
+        username="counter-author", email="author@example.com",
+        display_name="Counter Author")])
+    [story] = Story.objects.bulk_create([Story(
+        title="Counted story", slug="counted-story", body="Body", user=user,
+        **fields)])
+    return story
+
+
+@pytest.mark.django_db
+def test_adjust_counter_never_drops_below_zero():
+    story = create_story()
+
+    adjust_counter(story.id, "like_count", -1)
+    story.refresh_from_db()
+    assert story.like_count == 0
+
+    adjust_counter(story.id, "like_count", 2)
+    adjust_counter(story.id, "like_count", -3)
+    story.refresh_from_db()
+    assert story.like_count == 0
+
+
+@pytest.mark.django_db
+def test_adjust_counter_rejects_unknown_fields():
+    story = create_story()
+
+    with pytest.raises(ValueError):
+        adjust_counter(story.id, "title", 1)
+
+
+@pytest.mark.django_db
+def test_recompute_counters_restores_counts_from_source_rows():
+    story = create_story(like_count=7, dislike_count=3, view_count=5)
+    fans = CustomUser.objects.bulk_create([
+        CustomUser(username=f"fan-{n}", email=f"fan-{n}@example.com",
+                   display_name=f"Fan {n}")
+        for n in range(2)
+    ])
+    Like.objects.bulk_create([Like(user=fan, story=story) for fan in fans])
+
+    assert recompute_counters(Story.objects.filter(pk=story.pk)) == 1
+
+    story.refresh_from_db()
+    assert (story.like_count, story.dislike_count, story.view_count) == (2, 0, 0)
+
+
+# stories/tests/test_counters.py
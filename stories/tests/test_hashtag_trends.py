@@ -0,0 +1,52 @@
+from collections import Counter
+from unittest import mock
+from stories import hashtag_trends
+from stories.hashtag_trends import WINDOWS, record_hashtag_changes
+
+
+def recorded_increments(added=(), removed=(), occurred_at=None):
+    """
+    Run record_hashtag_changes against a mocked Redis and return the summed
+    ZINCRBY deltas per (bucket key, hashtag).
+    """
+    redis_conn = mock.MagicMock()
+    pipe = redis_conn.pipeline.return_value
+    with mock.patch.object(hashtag_trends, "get_redis_connection",
+                           return_value=redis_conn):
+        record_hashtag_changes(added, removed, occurred_at)
+    totals = Counter()
+    for call in pipe.zincrby.call_args_list:
+        key, delta, name = call.args
+        totals[(key, name)] += delta
+    return totals
+
+
+def test_removal_cancels_the_add_in_every_window():
+    added_at = 1_700_000_000.0
+    added = recorded_increments(added=["python"], occurred_at=added_at)
+    # The edit lands in later buckets of every window, but the removal must
+    # go back to the buckets of the add
+    removed = recorded_increments(
+        removed=[("python", added_at)], occurred_at=added_at + 4 * 60)
+
+    assert len(added) == len(WINDOWS)
+    assert all(delta == 1 for delta in added.values())
+    assert {key: -delta for key, delta in removed.items()} == added
+
+
+def test_removal_outside_a_window_is_skipped_there():
+    added_at = 1_700_000_000.0
+    # Two hours later the 1h window has slid past the add, the others have not
+    removed = recorded_increments(
+        removed=[("python", added_at)], occurred_at=added_at + 2 * 60 * 60)
+
+    windows = {key.split(":")[2] for key, _ in removed}
+    assert windows == {"24h", "7d"}
+
+
+def test_uncounted_removal_is_skipped():
+    assert recorded_increments(
+        removed=[("python", None)], occurred_at=1_700_000_000.0) == Counter()
+
+
+# stories/tests/test_hashtag_trends.py
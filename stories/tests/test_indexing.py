@@ -0,0 +1,87 @@
+from unittest import mock
+import pytest
+from stories import indexing
+from stories.indexing import flush_index_queue
+
+
+class FakeRedis:
+    """
+    Just enough of a Redis client for the pending-update sorted set.
+    """
+
+    def __init__(self, pending):
+        self.pending = dict(pending)
+        self.retries = {}
+
+    def zrange(self, key, start, stop, withscores=False):
+        members = sorted(self.pending.items(), key=lambda item: item[1])
+        return members[start:stop + 1]
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.pending.pop(member, None)
+
+    def zadd(self, key, mapping, nx=False):
+        for member, score in mapping.items():
+            if not (nx and member in self.pending):
+                self.pending[member] = score
+
+    def hincrby(self, key, field, amount=1):
+        self.retries[field] = self.retries.get(field, 0) + amount
+        return self.retries[field]
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.retries.pop(field, None)
+
+    def get(self, key):
+        return None
+
+    def lock(self, *args, **kwargs):
+        return mock.MagicMock()
+
+    def pipeline(self, *args, **kwargs):
+        return mock.MagicMock()
+
+
+@pytest.fixture
+def redis_conn():
+    redis_conn = FakeRedis({b"1": 100.0, b"2": 101.0, b"3": 102.0})
+    with mock.patch.object(indexing, "get_redis_connection",
+                           return_value=redis_conn):
+        yield redis_conn
+
+
+def test_failed_flush_puts_the_batch_back(redis_conn):
+    with mock.patch.object(indexing, "bulk",
+                           side_effect=ConnectionError("es down")):
+        with pytest.raises(ConnectionError):
+            flush_index_queue(batch_size=2)
+
+    # First-queued scores are kept, so the lag metric stays honest
+    assert redis_conn.pending == {b"1": 100.0, b"2": 101.0, b"3": 102.0}
+
+
+def test_flush_drains_every_pending_batch(redis_conn):
+    with mock.patch.object(indexing, "bulk", return_value=(1, [])) as bulk:
+        assert flush_index_queue(batch_size=1) == 3
+
+    assert bulk.call_count == 3
+    assert redis_conn.pending == {}
+
+
+
+def test_failed_documents_are_retried_then_dropped(redis_conn, settings):
+    settings.ES_INDEX_FLUSH_MAX_RETRIES = 1
+    errors = [{"index": {"_index": "stories", "_id": "2", "status": 400,
+                         "error": {"type": "mapper_parsing_exception"}}}]
+    with mock.patch.object(indexing, "bulk", return_value=(2, errors)):
+        flush_index_queue(batch_size=10)
+        # Only the failed story is queued again
+        assert list(redis_conn.pending) == [2]
+        assert redis_conn.retries == {2: 1}
+
+        flush_index_queue(batch_size=10)
+
+    assert redis_conn.pending == {}
+    assert redis_conn.retries == {}
@@ -0,0 +1,47 @@
+from stories.neo_sync import DELETE, UPSERT, _collapse, _parents_first
+
+
+def change(story_id, op=UPSERT, **fields):
+    return {"op": op, "story_id": story_id, "enqueued_at": 0.0, **fields}
+
+
+def test_collapse_keeps_the_last_record_per_story():
+    records = [
+        change(1, hashtags=["old"]),
+        change(2, hashtags=["a"]),
+        change(1, hashtags=["new"]),
+    ]
+
+    assert _collapse(records) == [
+        change(2, hashtags=["a"]),
+        change(1, hashtags=["new"]),
+    ]
+
+
+def test_collapse_lets_a_delete_win_over_earlier_upserts():
+    records = [change(1, hashtags=["a"]), change(1, op=DELETE)]
+
+    assert _collapse(records) == [change(1, op=DELETE)]
+
+
+def test_collapse_lets_a_recreate_win_over_an_earlier_delete():
+    records = [change(1, op=DELETE), change(1, hashtags=["a"])]
+
+    assert _collapse(records) == [change(1, hashtags=["a"])]
+
+
+def test_parents_first_orders_children_after_their_batch_parents():
+    records = [
+        change(3, parent_story_id=2),
+        change(9, parent_story_id=None),
+        change(2, parent_story_id=1),
+        change(1, parent_story_id=None),
+    ]
+
+    order = [record["story_id"] for record in _parents_first(records)]
+
+    assert sorted(order) == [1, 2, 3, 9]
+    assert order.index(1) < order.index(2) < order.index(3)
+
+
+# stories/tests/test_neo_sync.py
@@ -0,0 +1,175 @@
+import logging
+import time
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.db.models import ExpressionWrapper, FloatField, Sum, Value
+from django.db.models.functions import Extract, Power
+from django.utils import timezone
+from django_redis import get_redis_connection
+from .models import Like, Dislike
+
+# Set up the logger for this module
+logger = logging.getLogger('app_logger')
+
+# Redis keys
+LANDMARK_KEY = "trending:stories:landmark"
+GLOBAL_KEY = "trending:stories:global"
+CATEGORY_KEY = "trending:stories:category:{category_id}"
+
+# Event weights, mirroring the old `likes - dislikes + views` formula
+LIKE_WEIGHT = 1.0
+DISLIKE_WEIGHT = -1.0
+VIEW_WEIGHT = 1.0
+
+
+def _half_life_seconds():
+    return settings.TRENDING_HALF_LIFE_HOURS * 3600
+
+
+def _category_key(category_id):
+    return CATEGORY_KEY.format(category_id=category_id)
+
+
+def decay_factor(occurred_at, landmark):
+    """
+    Weight multiplier of an event relative to the landmark time.
+
+    Scores use forward decay: an event at time t contributes
+    weight * 2 ** ((t - landmark) / half_life). Every score shares the same
+    landmark, so ranking by the sum is ranking by the exponentially decayed
+    score at any point in time.
+    """
+    return 2 ** ((occurred_at - landmark) / _half_life_seconds())
+
+
+def record_event(story_id, weight, category_id=None, occurred_at=None):
+    """
+    Fold a single interaction event into the trending sorted sets.
+
+    `category_id` comes from the caller, which already has the story, and
+    callers skip soft-deleted or flagged stories. Removals (unlike,
+    undislike) are not folded back in; the periodic refresh rebuilds the
+    sets from source rows and corrects them.
+    """
+    try:
+        redis_conn = get_redis_connection("default")
+        landmark = redis_conn.get(LANDMARK_KEY)
+        if landmark is None:
+            logger.debug('Trending sets not built yet, skipping event')
+            return
+
+        occurred_at = occurred_at or time.time()
+        score = weight * decay_factor(occurred_at, float(landmark))
+
+        pipe = redis_conn.pipeline()
+        pipe.zincrby(GLOBAL_KEY, score, story_id)
+        if category_id is not None:
+            pipe.zincrby(_category_key(category_id), score, story_id)
+        pipe.execute()
+        logger.debug(
+            f'Recorded trending event for story {story_id} with score {score}')
+    except Exception as e:
+        logger.error(f'Error recording trending event for story {story_id}: {e}')
+
+
+def _decayed_scores(queryset, since, landmark):
+    """
+    Aggregate decayed event weights per story in the database.
+    """
+    exponent = ExpressionWrapper(
+        (Extract("created_at", "epoch") - Value(landmark)) /
+        Value(_half_life_seconds()),
+        output_field=FloatField(),
+    )
+    return (
+        queryset.filter(
+            created_at__gte=since,
+            story__deleted_at__isnull=True,
+            story__is_flagged=False,
+        )
+        .order_by()
+        .values("story_id", "story__category_id")
+        .annotate(score=Sum(Power(Value(2.0), exponent), output_field=FloatField()))
+        .values_list("story_id", "story__category_id", "score")
+        .iterator()
+    )
+
+
+def refresh_trending_sets():
+    """
+    Rebuild the global and per-category trending sorted sets from source rows.
+
+    Only events inside TRENDING_WINDOW_DAYS are considered, each set is
+    trimmed to TRENDING_TOP_N members and swapped in atomically.
+    """
+    StoryInteraction = apps.get_model('analytics', 'StoryInteraction')
+    now = timezone.now()
+    landmark = now.timestamp()
+    since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    top_n = settings.TRENDING_TOP_N
+
+    logger.info('Refreshing trending story sets')
+    global_scores = {}
+    category_scores = {}
+    sources = [
+        (Like.objects.all(), LIKE_WEIGHT),
+        (Dislike.objects.all(), DISLIKE_WEIGHT),
+        (StoryInteraction.objects.filter(interaction_type="view"), VIEW_WEIGHT),
+    ]
+    for queryset, weight in sources:
+        rows = _decayed_scores(queryset, since, landmark)
+        for story_id, category_id, score in rows:
+            score = weight * score
+            global_scores[story_id] = global_scores.get(story_id, 0) + score
+            if category_id is not None:
+                scores = category_scores.setdefault(category_id, {})
+                scores[story_id] = scores.get(story_id, 0) + score
+
+    redis_conn = get_redis_connection("default")
+    stale_keys = set(redis_conn.scan_iter(_category_key("*")))
+    pipe = redis_conn.pipeline()
+    for key, scores in [(GLOBAL_KEY, global_scores)] + [
+            (_category_key(category_id), scores)
+            for category_id, scores in category_scores.items()]:
+        stale_keys.discard(key.encode())
+        tmp_key = f"{key}:tmp"
+        pipe.delete(tmp_key)
+        if not scores:
+            pipe.delete(key)
+            continue
+        pipe.zadd(tmp_key, scores)
+        pipe.zremrangebyrank(tmp_key, 0, -(top_n + 1))
+        pipe.rename(tmp_key, key)
+    for key in stale_keys:
+        pipe.delete(key)
+    pipe.set(LANDMARK_KEY, landmark)
+    pipe.execute()
+    logger.info(
+        f'Trending sets refreshed for {len(global_scores)} stories '
+        f'across {len(category_scores)} categories')
+
+
+def top_story_ids(category_ids=None, limit=None):
+    """
+    Return trending story IDs, best first.
+
+    With `category_ids` the per-category sets are merged, otherwise the
+    global set is read.
+    """
+    limit = limit or settings.TRENDING_TOP_N
+    redis_conn = get_redis_connection("default")
+    if not category_ids:
+        return [int(story_id) for story_id in
+                redis_conn.zrevrange(GLOBAL_KEY, 0, limit - 1)]
+
+    pipe = redis_conn.pipeline()
+    for category_id in category_ids:
+        pipe.zrevrange(_category_key(category_id), 0,
+                       limit - 1, withscores=True)
+    merged = [entry for entries in pipe.execute() for entry in entries]
+    merged.sort(key=lambda entry: entry[1], reverse=True)
+    return [int(story_id) for story_id, _ in merged[:limit]]
+
+
+# stories/trending.py
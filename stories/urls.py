@@ -27,6 +27,7 @@ from .neo_views import (
     StorylineDetailView,
     StorylineStoriesView,
     SpecificStorylineHashtagsView,
+    StoryTimelineView,
 )
 
 
@@ -102,6 +103,11 @@ urlpatterns = [
         DislikeDestroyView.as_view(),
         name="undislike-story-by-id",
     ),
+    path(
+        "stories/<int:story_id>/timeline/",
+        StoryTimelineView.as_view(),
+        name="story-timeline",
+    ),
     path(
         "stories/<slug:slug>/storylines/",
         StorylinesForStoryView.as_view(),
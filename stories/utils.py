@@ -1,27 +1,30 @@
 import logging
 import time
-import re
 from django_redis import get_redis_connection
-from .models import UserSearchHistory
+from .models import UserSearchHistory, Story
 
 # Set up the logger for this module
 logger = logging.getLogger('app_logger')
 
 
-def extract_hashtags(text):
+def hydrate_stories(story_ids, queryset=None):
     """
-    Extract hashtags from a given text.
+    Load stories for an ordered list of IDs in a single query.
 
     Args:
-        text (str): The text to extract hashtags from.
+        story_ids (list): Story IDs in the order they should be returned.
+        queryset (QuerySet): Optional base queryset, e.g. with select_related.
 
     Returns:
-        set: A set of unique hashtags.
+        list: Stories in the order of `story_ids`; IDs without a matching
+        story are skipped.
     """
-    logger.debug(f'Extracting hashtags from text: {text}')
-    hashtags = set(part[1:] for part in re.findall(r"#\w+", text))
-    logger.info(f'Extracted hashtags: {hashtags}')
-    return hashtags
+    if queryset is None:
+        queryset = Story.objects.select_related(
+            "user", "category").prefetch_related("multimedia")
+    stories = queryset.in_bulk(story_ids)
+    logger.debug(f'Hydrated {len(stories)} of {len(story_ids)} stories')
+    return [stories[story_id] for story_id in story_ids if story_id in stories]
 
 
 # Cache search query in Redis with additional metadata (search_term, hits, searched_at)
@@ -7,9 +7,9 @@ from django.shortcuts import get_object_or_404
 from rest_framework import generics, filters, status, serializers
 from django.db import IntegrityError
 from users.models import UserSetting
-from stories.neo_models import StoryNode
 from .models import Story, Like, Dislike, Bookmark, Category, UserSearchHistory
 from django_redis import get_redis_connection
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from django_elasticsearch_dsl_drf.filter_backends import (
     FilteringFilterBackend,
@@ -24,10 +24,15 @@ from django_elasticsearch_dsl_drf.viewsets import DocumentViewSet
 from .documents import StoryDocument
 from .serializers import StoryDocumentSerializer, UserSearchHistorySerializer
 from .utils import (cache_search_query,
-                    store_user_search_history)
+                    store_user_search_history,
+                    hydrate_stories)
+from . import trending
+from .feeds import get_feed, feed_queryset
 
 from utils.permissions import CustomIsAuthenticated
-from utils.mixins import SoftDeleteMixin
+from utils.mixins import (SoftDeleteMixin, CursorPaginationMixin,
+                          AnonymousResponseCacheMixin, ConditionalGetMixin)
+from utils.cache import get_versions
 from .serializers import (
     LikeSerializer,
     DislikeSerializer,
@@ -36,10 +41,11 @@ from .serializers import (
     AutocompleteSerializer
 )
 # from .documents import AutocompleteDocument
-from utils.pagination import CustomPageNumberPagination
+from utils.pagination import CustomPageNumberPagination, LazySequence
 from utils.permissions import IsOwner
-from .mixins import StoryMixin
-from django.db.models import F, Count, Q as DjangoQ
+from .mixins import (StoryMixin, StoryProjectionMixin, HashtagFilterMixin,
+                     SearchVisibilityMixin, AnchoredWindowMixin)
+from django.db.models import F
 
 # Set up the logger for this module
 logger = logging.getLogger('app_logger')
@@ -80,43 +86,38 @@ class CategoryRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         return super().destroy(request, *args, **kwargs)
 
 
-class StoriesByCategoryView(generics.ListAPIView):
+class StoriesByCategoryView(AnonymousResponseCacheMixin, CursorPaginationMixin,
+                            HashtagFilterMixin, StoryProjectionMixin,
+                            generics.ListAPIView):
     queryset = Story.active_unflagged_objects.all()
     serializer_class = StorySerializer
     pagination_class = CustomPageNumberPagination
 
+    def get_cache_versions(self):
+        return [("category", self.kwargs.get("category_slug"))]
+
     def get_queryset(self):
         category_slug = self.kwargs.get("category_slug")
         logger.debug(f'Fetching stories for category slug: {category_slug}')
         return self.queryset.filter(category__slug=category_slug)
 
 
-class StoryListCreateView(generics.ListCreateAPIView):
+class StoryListCreateView(AnchoredWindowMixin, CursorPaginationMixin,
+                          HashtagFilterMixin, StoryProjectionMixin,
+                          SearchVisibilityMixin, generics.ListCreateAPIView):
     """View to list all stories or create a new story."""
 
     # permission_classes = [CustomIsAuthenticated]
     serializer_class = StorySerializer
 
     def get_queryset(self):
-        logger.debug('Fetching all stories with annotations and prefetches')
+        logger.debug('Fetching all stories with prefetches')
+        # Storylines are resolved per page by StorySerializer's list serializer
         stories = (
             Story.objects.all()
-            .annotate(
-                total_likes=Count("likes_set"), total_dislikes=Count("dislikes_set")
-            )
             .prefetch_related("multimedia")
             .order_by("-created_at")
         )
-
-        logger.debug('Prefetching related StoryNode objects from Neo4j')
-        # Prefetch related StoryNode objects from Neo4j
-        story_ids = [story.id for story in stories]
-        story_nodes = StoryNode.nodes.filter(story_id__in=story_ids)
-        # Create a dictionary to map story IDs to their corresponding StoryNode objects
-        story_node_map = {node.story_id: node for node in story_nodes}
-        for story in stories:
-            story.story_node = story_node_map.get(story.id)
-
         return stories
 
     def create(self, request, *args, **kwargs):
@@ -125,7 +126,8 @@ class StoryListCreateView(generics.ListCreateAPIView):
 
 
 class StoryRetrieveUpdateDestroyView(
-    SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView
+    ConditionalGetMixin, AnonymousResponseCacheMixin, SoftDeleteMixin,
+    SearchVisibilityMixin, generics.RetrieveUpdateDestroyAPIView
 ):
     """View to retrieve, update, or delete a story."""
 
@@ -134,6 +136,30 @@ class StoryRetrieveUpdateDestroyView(
     lookup_field = "slug"  # Use the slug for lookup
     lookup_url_kwarg = "story_slug"
 
+    def get_story_meta(self):
+        """
+        Return `(id, updated_at)` of the requested story, or None.
+        """
+        if not hasattr(self, "_story_meta"):
+            self._story_meta = (
+                Story.objects.filter(slug=self.kwargs["story_slug"])
+                .values_list("id", "updated_at")
+                .first()
+            )
+        return self._story_meta
+
+    def get_cache_versions(self):
+        # Versions are keyed by id so they survive slug changes
+        story_meta = self.get_story_meta()
+        return [("story", story_meta[0])] if story_meta else []
+
+    def get_resource_state(self):
+        story_meta = self.get_story_meta()
+        if story_meta is None:
+            return None
+        story_id, updated_at = story_meta
+        return [updated_at, *get_versions([("story", story_id)])]
+
     def retrieve(self, request, *args, **kwargs):
         logger.debug(f"Retrieving story with slug {kwargs['story_slug']}")
         return super().retrieve(request, *args, **kwargs)
@@ -414,6 +440,25 @@ class StorySearchView(DocumentViewSet):
 
         logger.info(f"Received search request with query: {query}")
 
+        # Only the requested page is fetched from Elasticsearch, which
+        # refuses to page past max_result_window
+        page_size = self.paginator.get_page_size(request)
+        try:
+            page_number = int(request.query_params.get(
+                self.paginator.page_query_param, 1))
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            raise NotFound("Invalid page.")
+        start = (page_number - 1) * page_size
+        max_result_window = StoryDocument.Index.settings.get(
+            "max_result_window", 10000)
+        if start > max_result_window - page_size:
+            return Response(
+                {"detail": f"Search results are limited to the first "
+                           f"{max_result_window} hits."},
+                status=400)
+
         try:
             # Use ngram-based matching for more flexibility
             search = self.document.search().query(
@@ -437,8 +482,16 @@ class StorySearchView(DocumentViewSet):
                             "slop": 10}
                     ),
                 )
-            # Fetch the results
-            response = search.execute()
+            # Hashtag filters hit the keyword field, not the analyzed body
+            for hashtag in request.query_params.getlist('hashtag'):
+                if hashtag.strip('# '):
+                    search = search.filter(
+                        'term', hashtags=hashtag.lstrip('#').lower())
+
+            # Stories are hydrated from Postgres, so the documents' _source
+            # is not needed
+            search = search.source(False).extra(track_total_hits=True)
+            response = search[start:start + page_size].execute()
 
             # Calculate the number of search results
             result_count = response.hits.total.value
@@ -449,32 +502,26 @@ class StorySearchView(DocumentViewSet):
             # Store the user search history if there are hits
             store_user_search_history(user, query, result_count)
 
-            # Apply pagination
-            page = self.paginate_queryset(response.hits)
-            if page is not None:
-                # Convert Elasticsearch documents into Django model instances
-                story_ids = [hit.meta.id for hit in page]
-                stories = Story.objects.filter(id__in=story_ids)
-
-                # Serialize using the native StorySerializer
-                serializer = self.get_serializer(stories, many=True)
-                logger.info(
-                    f"Returning paginated search results for query: {query}")
-                return self.get_paginated_response(serializer.data)
-
-            # Convert Elasticsearch documents into Django model instances
-            story_ids = [hit.meta.id for hit in response.hits]
-            stories = Story.objects.filter(id__in=story_ids)
-
-            # Serialize using the native StorySerializer
-            serializer = self.get_serializer(stories, many=True)
-            logger.info(f"Returning search results for query: {query}")
-            return Response(serializer.data)
-
         except Exception as e:
             logger.error(f"Error occurred during search: {e}")
             return Response({"detail": "An error occurred during search."}, status=500)
 
+        def fetch(offset, stop):
+            # The paginator clips the last page to the total
+            hits = list(response.hits) if offset == start else \
+                search[offset:stop].execute().hits
+            # Hydrate in score order in one query
+            return hydrate_stories(
+                [int(hit.meta.id) for hit in hits][:stop - offset])
+
+        # Pages past max_result_window cannot be fetched, so they are not
+        # counted either; out-of-range pages get the paginator's 404
+        page = self.paginate_queryset(LazySequence(
+            lambda: min(result_count, max_result_window), fetch))
+        serializer = self.get_serializer(page, many=True)
+        logger.info(f"Returning paginated search results for query: {query}")
+        return self.get_paginated_response(serializer.data)
+
 
 class CachedSearchQueriesView(generics.ListAPIView):
     """
@@ -547,7 +594,8 @@ class UserSearchHistoryView(generics.ListAPIView):
         return UserSearchHistory.objects.filter(user=self.request.user)
 
 
-class UserFeedView(generics.ListAPIView):
+class UserFeedView(CursorPaginationMixin, HashtagFilterMixin,
+                   StoryProjectionMixin, generics.ListAPIView):
     serializer_class = StorySerializer
     # permission_classes = [CustomIsAuthenticated]
 
@@ -559,29 +607,31 @@ class UserFeedView(generics.ListAPIView):
             logger.debug("User is not authenticated.")
             return Story.objects.none()
 
+        # Same filters as the materialized feed served by list()
+        return feed_queryset(user.id).order_by("-created_at")
+
+    def list(self, request, *args, **kwargs):
+        if (not request.user.is_authenticated
+                or self.wants_cursor_pagination()
+                or self.get_hashtag_filters()):
+            return super().list(request, *args, **kwargs)
+
         try:
-            user_settings = UserSetting.objects.get(user=user)
-            preferred_categories = user_settings.personal_settings.get(
-                "favorite_categories", []
-            )
-            logger.debug(
-                f"The preferred_categories: {preferred_categories} found!")
-        except UserSetting.DoesNotExist:
-            logger.debug("User settings not found.")
-            return Story.objects.none()
+            feed = get_feed(request.user)
+        except Exception as e:
+            logger.error(f"Error reading materialized feed: {e}")
+            feed = None
+        if feed is None:
+            return super().list(request, *args, **kwargs)
 
-        if "__all__" in preferred_categories:
-            return Story.objects.all().order_by("-created_at")
-        elif preferred_categories:
-            return Story.objects.filter(category__id__in=preferred_categories).order_by(
-                "-created_at"
-            )
-        else:
-            logger.debug("Favorite categories are empty.")
-            return Story.objects.none()
+        # Only the requested slice of the feed is hydrated from Postgres
+        page = self.paginate_queryset(feed)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class UserInverseFeedView(generics.ListAPIView):
+class UserInverseFeedView(CursorPaginationMixin, HashtagFilterMixin,
+                          StoryProjectionMixin, generics.ListAPIView):
     serializer_class = StorySerializer
 
     def get_queryset(self):
@@ -620,11 +670,19 @@ class UserInverseFeedView(generics.ListAPIView):
 class TrendingStoriesView(generics.ListAPIView):
     serializer_class = TrendingStorySerializer
 
-    def get_queryset(self):
+    def get_favorite_categories(self):
+        """
+        Return the viewer's favorite categories, looked up once per request.
+        """
+        if not hasattr(self, "_favorite_categories"):
+            self._favorite_categories = self.load_favorite_categories()
+        return self._favorite_categories
+
+    def load_favorite_categories(self):
         user = self.request.user
         if not user.is_authenticated:
             logger.debug("User is not authenticated.")
-            return Story.objects.none()
+            return None
 
         try:
             user_settings = UserSetting.objects.get(user=user)
@@ -633,24 +691,22 @@ class TrendingStoriesView(generics.ListAPIView):
             )
             logger.debug(
                 f"Favorite categories for user {user.id}: {favorite_categories}")
-
+            return favorite_categories
         except UserSetting.DoesNotExist:
             logger.debug("User settings not found.")
+            return None
+
+    def get_queryset(self):
+        # Fallback used until the trending sets have been built
+        favorite_categories = self.get_favorite_categories()
+        if not favorite_categories:
             return Story.objects.none()
 
+        queryset = Story.active_unflagged_objects.active_and_unflagged()
+        if "__all__" not in favorite_categories:
+            queryset = queryset.filter(category__id__in=favorite_categories)
         queryset = (
-            Story.objects.filter(category__id__in=favorite_categories)
-            .annotate(
-                like_count=Count("likes_set", distinct=True),
-                dislike_count=Count("dislikes_set", distinct=True),
-                view_count=Count(
-                    "interactions",
-                    filter=DjangoQ(
-                        interactions__interaction_type="view"),
-                    distinct=True,
-                ),
-            )
-            .annotate(
+            queryset.annotate(
                 calculated_trending_score=F("like_count")
                 - F("dislike_count")
                 + F("view_count")
@@ -661,6 +717,36 @@ class TrendingStoriesView(generics.ListAPIView):
         logger.debug("Trending stories queryset prepared.")
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        favorite_categories = self.get_favorite_categories()
+        if not favorite_categories:
+            return super().list(request, *args, **kwargs)
+
+        category_ids = (None if "__all__" in favorite_categories
+                        else favorite_categories)
+        try:
+            story_ids = trending.top_story_ids(category_ids)
+        except Exception as e:
+            logger.error(f"Error reading trending stories from Redis: {e}")
+            story_ids = []
+        if not story_ids:
+            logger.debug("Trending sets are empty, using counter ordering.")
+            return super().list(request, *args, **kwargs)
+
+        # Only the requested slice of IDs is hydrated from Postgres; stories
+        # retracted since the last refresh of the sets are left out
+        page = self.paginate_queryset(story_ids)
+        stories = hydrate_stories(
+            page if page is not None else story_ids,
+            Story.active_unflagged_objects.active_and_unflagged()
+            .select_related("user", "category")
+            .prefetch_related("multimedia"),
+        )
+        serializer = self.get_serializer(stories, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
 
 class LikeCreateView(StoryMixin, generics.CreateAPIView):
     queryset = Like.objects.all()
@@ -748,7 +834,11 @@ class BookmarkCreateListView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         logger.debug(f"Listing bookmarks for user {user.id}")
-        queryset = Bookmark.objects.filter(user=user)
+        queryset = (
+            Bookmark.objects.filter(user=user)
+            .select_related("user", "story__user", "story__category")
+            .prefetch_related("story__multimedia")
+        )
 
         # Get the 'category' query parameter
         category = self.request.query_params.get("category", None)
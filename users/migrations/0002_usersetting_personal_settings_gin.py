@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usersetting',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['personal_settings'], name='usersetting_personal_gin_idx', opclasses=['jsonb_path_ops']),
+        ),
+    ]
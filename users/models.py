@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
 from django.db.models import JSONField
 from authentication.models import CustomUser
 # from stories.models import Story
@@ -15,6 +16,12 @@ class UserSetting(SoftDeletableModel, TimestampedModel):
     class Meta:
         verbose_name = "User Setting"
         verbose_name_plural = "Users Setting"
+        indexes = [
+            # Backs the favorite_categories containment lookup of feed fan-out
+            GinIndex(fields=["personal_settings"],
+                     name="usersetting_personal_gin_idx",
+                     opclasses=["jsonb_path_ops"]),
+        ]
 
     def __str__(self):
         return f"{self.user.email}'s Settings"
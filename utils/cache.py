@@ -0,0 +1,53 @@
+import hashlib
+import logging
+from django_redis import get_redis_connection
+
+logger = logging.getLogger("app_logger")
+
+VERSION_KEY = "version:{namespace}:{key}"
+RESPONSE_KEY = "response:{view}:{path}:{versions}"
+
+
+def _version_key(namespace, key):
+    return VERSION_KEY.format(namespace=namespace, key=key)
+
+
+def get_versions(entities):
+    """
+    Return the current version counters of the given (namespace, key) pairs.
+
+    Entities that were never bumped are at version 0.
+    """
+    if not entities:
+        return []
+    redis_conn = get_redis_connection("default")
+    values = redis_conn.mget(
+        [_version_key(namespace, key) for namespace, key in entities])
+    return [int(value) if value else 0 for value in values]
+
+
+def bump_version(namespace, key):
+    """
+    Increment an entity's version so every cache entry built on it is skipped.
+    """
+    try:
+        get_redis_connection("default").incr(_version_key(namespace, key))
+        logger.debug(f"Bumped cache version for {namespace}:{key}")
+    except Exception as e:
+        logger.error(f"Error bumping cache version for {namespace}:{key}: {e}")
+
+
+def build_response_key(view_name, request, versions):
+    """
+    Build a response cache key from the view, the full path and entity versions.
+    """
+    query = sorted(request.query_params.lists())
+    path = hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+    return RESPONSE_KEY.format(
+        view=view_name,
+        path=path,
+        versions=".".join(str(version) for version in versions),
+    )
+
+
+# utils/cache.py
@@ -1,5 +1,15 @@
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
 from rest_framework.response import Response
 from rest_framework import status
+from .cache import get_versions, build_response_key
+from .pagination import KeysetCursorPagination
+
+logger = logging.getLogger("app_logger")
 
 class SoftDeleteMixin:
     """
@@ -14,3 +24,118 @@ class SoftDeleteMixin:
 class ReportCreationMixin:
     def handle_post_report_creation(self, instance):
         instance.check_and_update_flag_status()
+
+
+class CursorPaginationMixin:
+    """
+    Mixin that lets clients opt into keyset pagination on a list view.
+
+    Requests with `?pagination=cursor` or a `cursor` parameter are paginated
+    with `cursor_pagination_class`; all other requests keep the view's
+    regular page-number pagination.
+    """
+    cursor_pagination_class = KeysetCursorPagination
+
+    def wants_cursor_pagination(self):
+        params = self.request.query_params
+        return (params.get("pagination") == "cursor"
+                or self.cursor_pagination_class.cursor_query_param in params)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and self.wants_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Mixin that caches successful anonymous GET responses.
+
+    Cache keys embed the version counters returned by `get_cache_versions()`,
+    so bumping an entity's version makes every dependent entry unreachable
+    without scanning or purging keys. Entries also expire after
+    `cache_timeout` seconds.
+    """
+    cache_timeout = None
+
+    def get_cache_versions(self):
+        """
+        Return the (namespace, key) pairs whose versions the response depends on.
+        """
+        return []
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        try:
+            versions = get_versions(self.get_cache_versions())
+            cache_key = build_response_key(
+                self.__class__.__name__, request, versions)
+            cached_data = cache.get(cache_key)
+        except Exception as e:
+            logger.error(f"Error reading response cache: {e}")
+            return super().get(request, *args, **kwargs)
+
+        if cached_data is not None:
+            logger.debug(f"Serving cached response for {request.path}")
+            return Response(cached_data)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            timeout = self.cache_timeout or settings.RESPONSE_CACHE_TIMEOUT
+            try:
+                cache.set(cache_key, response.data, timeout)
+            except Exception as e:
+                logger.error(f"Error writing response cache: {e}")
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Mixin that answers conditional GETs (If-None-Match).
+
+    `get_resource_state()` does a cheap metadata lookup and returns the values
+    the response depends on. When the client already holds the matching ETag,
+    a 304 is returned before any of the full query or serialization work runs.
+
+    No Last-Modified is sent: counters and related stories change the
+    response without moving any timestamp, so only the version-based ETag
+    is a safe validator.
+    """
+
+    def get_resource_state(self):
+        """
+        Return the version parts of the resource, or None when the resource
+        cannot be described cheaply (the request then runs as usual).
+        """
+        return None
+
+    def build_etag(self, request, version_parts):
+        # The viewer is part of the ETag because responses carry viewer flags
+        source = repr([request.get_full_path(), request.user.pk, *version_parts])
+        return quote_etag(hashlib.md5(source.encode()).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        try:
+            state = self.get_resource_state()
+        except Exception as e:
+            logger.error(f"Error reading resource state: {e}")
+            state = None
+        if state is None:
+            return super().get(request, *args, **kwargs)
+
+        etag = self.build_etag(request, state)
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            logger.debug(f"Conditional GET matched for {request.path}")
+            patch_vary_headers(not_modified, ["Authorization"])
+            return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+        patch_vary_headers(response, ["Authorization"])
+        return response
@@ -1,5 +1,13 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from abc import ABC, abstractmethod
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, PageNumberPagination,
+                                       _positive_int)
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from .constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PAGE_SIZE_QUERY_PARAM
 
 
@@ -17,7 +25,8 @@ class CustomPageNumberPagination(PageNumberPagination):
         """
         Override to add logging for better debugging.
         """
-        logger.debug(f"Paginating queryset with {len(queryset)} items.")
+        # Do not call len() here: it would evaluate the whole queryset
+        logger.debug("Paginating queryset.")
         return super().paginate_queryset(queryset, request, view)
 
     def get_paginated_response(self, data):
@@ -35,4 +44,182 @@ class CustomPageNumberPagination(PageNumberPagination):
         return Response(response_data)
 
 
+class LazySequence:
+    """
+    Paginator-compatible sequence backed by callables instead of a queryset.
+
+    `count` returns the total number of items and `fetch(start, stop)` returns
+    the items of one slice, so pagination only loads the requested page.
+    """
+
+    def __init__(self, count, fetch):
+        self._count = count
+        self._fetch = fetch
+        self._total = None
+
+    def count(self):
+        if self._total is None:
+            self._total = self._count()
+        return self._total
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start = index.start or 0
+            stop = index.stop if index.stop is not None else self.count()
+            return self._fetch(start, stop)
+        return self._fetch(index, index + 1)[0]
+
+
+class KeysetPaginationBase(ABC, BasePagination):
+    """
+    Shared machinery of the keyset (cursor) paginations.
+
+    Cursors are opaque to clients: base64 JSON holding the direction and the
+    position of the page edge. Subclasses define how a page is seeked from a
+    position (`fetch_rows`), how positions are stored in a cursor
+    (`cursor_data` / `cursor_position`) and how rows map to positions and
+    results. No COUNT(*) is issued, so every page costs the same no matter
+    how deep it is.
+    """
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = PAGE_SIZE_QUERY_PARAM
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    @abstractmethod
+    def fetch_rows(self, source, position, reverse, limit):
+        """
+        Return up to `limit` rows past `position` (None for the first page),
+        walking backwards when `reverse` is set.
+        """
+
+    @abstractmethod
+    def cursor_data(self, position):
+        """
+        Return the JSON-serializable cursor fields of `position`.
+        """
+
+    @abstractmethod
+    def cursor_position(self, data):
+        """
+        Return the position stored in decoded cursor `data`.
+        """
+
+    def row_position(self, row):
+        return row
+
+    def build_results(self, source, rows):
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return bool(data["r"]), self.cursor_position(data)
+        except (TypeError, ValueError, KeyError) as e:
+            logger.warning(f"Invalid pagination cursor {encoded}: {e}")
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, reverse, position):
+        data = {"r": int(reverse), **self.cursor_data(position)}
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse, position = cursor if cursor else (False, None)
+
+        rows = self.fetch_rows(queryset, position, reverse, page_size + 1)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Moving backwards guarantees a next page, moving forwards from a
+        # cursor guarantees a previous one.
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else cursor is not None
+        self.positions = [self.row_position(row) for row in rows]
+        self.page = results = self.build_results(queryset, rows)
+        logger.debug(
+            f"Keyset page of {len(results)} items (reverse={reverse}).")
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.positions:
+            return None
+        return self.encode_cursor(False, self.positions[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.positions:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(True, self.positions[0])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+            },
+            'results': data,
+        })
+
+
+class KeysetCursorPagination(KeysetPaginationBase):
+    """
+    Keyset pagination over `(created_at, id)`, newest first.
+
+    Each page seeks past the last row of the previous one instead of using
+    OFFSET. Backed by the composite `(-created_at, -id)` index.
+    """
+
+    def cursor_data(self, position):
+        created_at, pk = position
+        return {"t": created_at.isoformat(), "i": pk}
+
+    def cursor_position(self, data):
+        created_at = parse_datetime(data["t"])
+        if created_at is None:
+            raise ValueError(data["t"])
+        return created_at, int(data["i"])
+
+    def row_position(self, story):
+        return story.created_at, story.id
+
+    def fetch_rows(self, queryset, position, reverse, limit):
+        if position is not None:
+            created_at, pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        ordering = ("created_at", "id") if reverse else ("-created_at", "-id")
+        return list(queryset.order_by(*ordering)[:limit])
+
+
 # utils/pagination.py
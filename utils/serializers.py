@@ -2,6 +2,10 @@ from django.db import models
 from rest_framework.serializers import ModelSerializer
 from .fields import UnixTimestampDateTimeField
 
+FIELDS_QUERY_PARAM = 'fields'
+EXPAND_QUERY_PARAM = 'expand'
+
+
 class UnixTimestampModelSerializer(ModelSerializer):
     """
     A base serializer that represents DateTimeField as UNIX timestamps.
@@ -10,3 +14,46 @@ class UnixTimestampModelSerializer(ModelSerializer):
         **ModelSerializer.serializer_field_mapping,
         models.DateTimeField: UnixTimestampDateTimeField
     }
+
+
+def parse_fields_param(request, param=FIELDS_QUERY_PARAM):
+    """
+    Return the set of names in a comma separated query parameter, or None.
+    """
+    if request is None or request.method != 'GET':
+        return None
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    A serializer mixin that honours the `?fields=` and `?expand=` parameters.
+
+    `fields` restricts the output of the top-level serializer to the listed
+    fields, and `expand` adds any of `Meta.expandable_fields` on top of them.
+    Fields that are dropped are never evaluated, so their queries are skipped.
+    Without `fields` every declared field is returned.
+    """
+
+    def get_requested_fields(self):
+        # Only the serializer the view was asked for is pruned, not nested ones
+        if self.root is not self and self.root is not self.parent:
+            return None
+        request = self.context.get('request')
+        requested = parse_fields_param(request)
+        if requested is None:
+            return None
+        expandable = set(getattr(self.Meta, 'expandable_fields', ()))
+        expanded = parse_fields_param(request, EXPAND_QUERY_PARAM) or set()
+        return requested | (expanded & expandable)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.get_requested_fields()
+        if requested is None:
+            return fields
+        return {name: field for name, field in fields.items()
+                if name in requested}